@@ -0,0 +1,174 @@
+"""
+Bytes stored, upload time and read time of the ingested parquet for different codecs, row group
+sizes and dictionary encoding settings. Also checks that a projected read of the last encoding
+fetches fewer bytes than the object size, with the local cache enabled.
+
+Uses NYC trip rows from --csv when given (e.g. a yellow_tripdata CSV with lower case column names),
+otherwise synthetic trips with the same columns. Objects are written through SimpleStorageService
+to the configured storage backend, or to a local moto server when neither STORAGE_BACKEND nor
+AWS_S3_ENDPOINT_URL is set.
+
+    python benchmarks/parquet_encoding_benchmark.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nyc_taxi_trips.constants import S3_ENDPOINT_URL_ENV_KEY, STORAGE_BACKEND_ENV_KEY
+from s3_transfer_benchmark import start_local_s3, MB
+
+
+BENCHMARK_BUCKET_NAME = "nyc-parquet-benchmark"
+BENCHMARK_KEY = "benchmark/trips.parquet"
+LOW_CARDINALITY_COLUMNS = ["vendorid", "passenger_count", "ratecodeid", "store_and_fwd_flag", "pulocationid",
+                           "dolocationid", "payment_type", "extra", "mta_tax", "improvement_surcharge",
+                           "congestion_surcharge"]
+
+
+def synthetic_trips(rows: int, seed: int = 0) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    pickup = pd.Timestamp("2019-01-01") + pd.to_timedelta(random.integers(0, 31 * 86400, rows), unit="s")
+    dropoff = pickup + pd.to_timedelta(random.integers(60, 3600, rows), unit="s")
+    fare = random.gamma(3, 4, rows).round(2)
+    tip = random.gamma(1, 2, rows).round(2)
+    return pd.DataFrame({
+        "vendorid": random.integers(1, 3, rows).astype(float),
+        "tpep_pickup_datetime": pickup.strftime("%Y-%m-%d %H:%M:%S"),
+        "tpep_dropoff_datetime": dropoff.strftime("%Y-%m-%d %H:%M:%S"),
+        "passenger_count": random.integers(1, 7, rows).astype(float),
+        "trip_distance": random.gamma(2, 2, rows).round(2),
+        "ratecodeid": random.choice([1.0, 2.0, 5.0], rows, p=[0.95, 0.03, 0.02]),
+        "store_and_fwd_flag": random.choice(["N", "Y"], rows, p=[0.99, 0.01]),
+        "pulocationid": random.integers(1, 266, rows).astype(float),
+        "dolocationid": random.integers(1, 266, rows).astype(float),
+        "payment_type": random.choice([1.0, 2.0, 3.0, 4.0], rows, p=[0.7, 0.28, 0.01, 0.01]),
+        "fare_amount": fare,
+        "extra": random.choice([0.0, 0.5, 1.0], rows),
+        "mta_tax": 0.5,
+        "tip_amount": tip,
+        "tolls_amount": 0.0,
+        "improvement_surcharge": 0.3,
+        "total_amount": (fare + tip + 0.8).round(2),
+        "congestion_surcharge": random.choice([0.0, 2.5], rows),
+    })
+
+
+def count_fetched_bytes(backend) -> dict:
+    """
+    Wraps the download and ranged read methods of backend to add up the bytes they return
+    """
+    fetched = {"bytes": 0, "full_downloads": 0}
+    download_file, download_fileobj, read_range = backend.download_file, backend.download_fileobj, backend.read_range
+
+    def counted_download_file(bucket_name, key, filename):
+        download_file(bucket_name, key, filename)
+        fetched["bytes"] += os.path.getsize(filename)
+        fetched["full_downloads"] += 1
+
+    def counted_download_fileobj(bucket_name, key, fileobj):
+        start = fileobj.tell()
+        download_fileobj(bucket_name, key, fileobj)
+        fetched["bytes"] += fileobj.tell() - start
+        fetched["full_downloads"] += 1
+
+    def counted_read_range(bucket_name, key, start, end):
+        data = read_range(bucket_name, key, start, end)
+        fetched["bytes"] += len(data)
+        return data
+
+    backend.download_file, backend.download_fileobj, backend.read_range = \
+        counted_download_file, counted_download_fileobj, counted_read_range
+    return fetched
+
+
+def check_projected_read(bucket_name: str, key: str, columns: list) -> None:
+    """
+    Reads columns of key through a storage service with an empty local cache and fails when the
+    read fetched the whole object instead of ranges of it
+    """
+    from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+    from nyc_taxi_trips.entity.config_entity import S3CacheConfig
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        storage = SimpleStorageService(cache_config=S3CacheConfig(enabled=True, cache_dir=cache_dir))
+        if storage.backend.is_local:
+            print("projected read check skipped: local files are memory mapped, not fetched")
+            return
+        size = storage.head_object(bucket_name, key)["size"]
+        fetched = count_fetched_bytes(storage.backend)
+        storage.read_parquet_from_s3(bucket_name, key, columns=columns)
+        print(f"projected read of {columns}: fetched {fetched['bytes'] / MB:.2f} of {size / MB:.2f} MB, "
+              f"{fetched['full_downloads']} full downloads")
+        assert fetched["full_downloads"] == 0 and fetched["bytes"] < size, "projected read fetched the whole object"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="NYC trip CSV to take the rows from")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--codecs", nargs="+", default=["snappy", "zstd", "lz4"])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3, 9], help="levels tried for zstd")
+    parser.add_argument("--row-group-sizes", type=int, nargs="+", default=[64 * 1024, 128 * 1024, 1024 * 1024])
+    args = parser.parse_args()
+
+    server = None
+    if not os.getenv(STORAGE_BACKEND_ENV_KEY) and not os.getenv(S3_ENDPOINT_URL_ENV_KEY):
+        server = start_local_s3()
+
+    from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+    from nyc_taxi_trips.entity.config_entity import ParquetEncodingConfig, S3CacheConfig
+
+    df = pd.read_csv(args.csv, nrows=args.rows) if args.csv else synthetic_trips(args.rows)
+    df.columns = [column.lower() for column in df.columns]
+
+    storage = SimpleStorageService(cache_config=S3CacheConfig(enabled=False))
+    if storage.s3_client is not None:
+        try:
+            storage.s3_client.create_bucket(Bucket=BENCHMARK_BUCKET_NAME)
+        except storage.s3_client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+    encodings = []
+    for codec in args.codecs:
+        levels = args.levels if codec == "zstd" else [None]
+        for level in levels:
+            for row_group_size in args.row_group_sizes:
+                for dictionary_columns in (None, LOW_CARDINALITY_COLUMNS):
+                    encodings.append(ParquetEncodingConfig(compression=codec, compression_level=level,
+                                                           row_group_size=row_group_size,
+                                                           dictionary_columns=dictionary_columns))
+
+    print(f"rows: {len(df)}, in memory: {df.memory_usage(deep=True).sum() / MB:.1f} MB, backend: {storage.backend.name}")
+    print(f"{'codec':>8} {'level':>6} {'row group':>10} {'dictionary':>11} {'stored MB':>10} {'upload s':>9} {'read s':>7}")
+    try:
+        for encoding in encodings:
+            start = time.perf_counter()
+            storage.write_parquet_to_s3(df, BENCHMARK_BUCKET_NAME, BENCHMARK_KEY, encoding=encoding)
+            upload_seconds = time.perf_counter() - start
+
+            stored = storage.head_object(BENCHMARK_BUCKET_NAME, BENCHMARK_KEY)["size"]
+
+            start = time.perf_counter()
+            read = storage.read_parquet_from_s3(BENCHMARK_BUCKET_NAME, BENCHMARK_KEY)
+            read_seconds = time.perf_counter() - start
+            assert len(read) == len(df)
+
+            dictionary = "all" if encoding.dictionary_columns is None else "low card."
+            print(f"{encoding.compression:>8} {str(encoding.compression_level or '-'):>6} {encoding.row_group_size:>10} "
+                  f"{dictionary:>11} {stored / MB:>10.1f} {upload_seconds:>9.2f} {read_seconds:>7.2f}")
+
+        check_projected_read(BENCHMARK_BUCKET_NAME, BENCHMARK_KEY, ["trip_distance", "total_amount"])
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Throughput of SimpleStorageService transfers for different part sizes and concurrency levels.
+
+Runs against the S3 compatible endpoint in AWS_S3_ENDPOINT_URL (e.g. a local MinIO). When it is
+not set, a local moto server is started as the S3 stand-in (pip install "moto[server]"). It
+measures S3 transfers only and refuses to run with STORAGE_BACKEND=local.
+
+    python benchmarks/s3_transfer_benchmark.py --size-mb 256
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nyc_taxi_trips.constants import S3_ENDPOINT_URL_ENV_KEY, STORAGE_BACKEND_ENV_KEY
+
+
+BENCHMARK_BUCKET_NAME = "nyc-transfer-benchmark"
+BENCHMARK_KEY = "benchmark/object.bin"
+MB = 1024 * 1024
+
+
+def start_local_s3():
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit(f"Set {S3_ENDPOINT_URL_ENV_KEY} or install moto[server] to run the benchmark")
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    os.environ[S3_ENDPOINT_URL_ENV_KEY] = f"http://{host}:{port}"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    return server
+
+
+def throughput(size: int, seconds: float) -> str:
+    return f"{size / MB / seconds:8.1f} MB/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--part-sizes-mb", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    if os.getenv(STORAGE_BACKEND_ENV_KEY, "s3").lower() != "s3":
+        raise SystemExit(f"The transfer benchmark measures S3 transfers, unset {STORAGE_BACKEND_ENV_KEY} to run it")
+
+    server = None if os.getenv(S3_ENDPOINT_URL_ENV_KEY) else start_local_s3()
+
+    from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+    from nyc_taxi_trips.entity.config_entity import S3TransferConfig
+
+    size = args.size_mb * MB
+    payload = os.urandom(size)
+
+    storage = SimpleStorageService()
+    try:
+        storage.s3_client.create_bucket(Bucket=BENCHMARK_BUCKET_NAME)
+    except storage.s3_client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    print(f"object size: {args.size_mb} MB, endpoint: {os.environ[S3_ENDPOINT_URL_ENV_KEY]}")
+    print(f"{'part MB':>8} {'threads':>8} {'upload':>13} {'download':>13} {'ranged stream':>14}")
+    try:
+        for part_size_mb in args.part_sizes_mb:
+            for concurrency in args.concurrency:
+                transfer_config = S3TransferConfig(multipart_threshold=part_size_mb * MB,
+                                                   part_size=part_size_mb * MB,
+                                                   max_concurrency=concurrency)
+                storage = SimpleStorageService(transfer_config=transfer_config)
+
+                with storage.new_buffer() as buffer:
+                    buffer.write(payload)
+                    start = time.perf_counter()
+                    storage.upload_from_buffer(buffer, BENCHMARK_BUCKET_NAME, BENCHMARK_KEY)
+                    upload_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                with storage.download_to_buffer(BENCHMARK_BUCKET_NAME, BENCHMARK_KEY):
+                    download_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                streamed = sum(len(part) for part in storage.transfer.iter_ranges(BENCHMARK_BUCKET_NAME, BENCHMARK_KEY))
+                stream_seconds = time.perf_counter() - start
+                assert streamed == size
+                storage.transfer.shutdown()
+
+                print(f"{part_size_mb:>8} {concurrency:>8} {throughput(size, upload_seconds):>13} "
+                      f"{throughput(size, download_seconds):>13} {throughput(size, stream_seconds):>14}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
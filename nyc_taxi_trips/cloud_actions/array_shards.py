@@ -0,0 +1,119 @@
+import posixpath
+import sys
+import tempfile
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+ARRAY_SHARD_INDEX_VERSION = 1
+
+
+def shard_keys(index_key: str, shard_number: int) -> Tuple[str, str]:
+    """
+    Returns the features and target keys of a shard, stored next to the index manifest
+    """
+    prefix = posixpath.dirname(index_key)
+    return (posixpath.join(prefix, f"features-{shard_number:05d}.npy"),
+            posixpath.join(prefix, f"target-{shard_number:05d}.npy"))
+
+
+def build_shard_index(features: np.ndarray, target: np.ndarray, index_key: str, shard_rows: int) -> Tuple[dict, List[Tuple[str, str, slice]]]:
+    """
+    Returns the index manifest of a sharded (features, target) artifact and, for every shard, its
+    keys with the row slice it holds. Slices are views, so sharding never copies the arrays.
+    """
+    if len(features) != len(target):
+        raise Exception(f"Features have {len(features)} rows but target has {len(target)}")
+    rows = len(features)
+    shards, slices = [], []
+    for shard_number, start in enumerate(range(0, max(rows, 1), shard_rows)):
+        end = min(start + shard_rows, rows)
+        features_key, target_key = shard_keys(index_key, shard_number)
+        shards.append({"features_key": features_key, "target_key": target_key, "rows": end - start})
+        slices.append((features_key, target_key, slice(start, end)))
+    index = {
+        "version": ARRAY_SHARD_INDEX_VERSION,
+        "rows": rows,
+        "features_shape": [rows, *features.shape[1:]],
+        "features_dtype": str(features.dtype),
+        "target_shape": [rows, *target.shape[1:]],
+        "target_dtype": str(target.dtype),
+        "shards": shards,
+    }
+    return index, slices
+
+
+class ShardedArrays:
+    """
+    Features and target stored as row shards of .npy files with an index manifest. Shards are
+    memory mapped lazily when first used; readers that can work shard by shard should use
+    iter_shards(). features() and target() build a consolidated array, itself a disk backed
+    memory map, when there is more than one shard: that is a full extra copy on local disk, kept
+    for consumers such as the model factory that need the whole array at once.
+    """
+
+    def __init__(self, storage, bucket_name: str, index: dict):
+        if index.get("version") != ARRAY_SHARD_INDEX_VERSION:
+            raise Exception(f"Unsupported array shard index version {index.get('version')}")
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.index = index
+        self._consolidated = {}
+        self._temp_files = []
+
+    @property
+    def rows(self) -> int:
+        return self.index["rows"]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.index["shards"])
+
+    def shard(self, shard_number: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the memory mapped (features, target) of one shard
+        """
+        return self._load(shard_number, "features_key"), self._load(shard_number, "target_key")
+
+    def _load(self, shard_number: int, key_name: str) -> np.ndarray:
+        return self.storage.load_array_from_s3(self.bucket_name, self.index["shards"][shard_number][key_name])
+
+    def iter_shards(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for shard_number in range(self.num_shards):
+            yield self.shard(shard_number)
+
+    def _consolidate(self, key_name: str, shape: list, dtype: str) -> np.ndarray:
+        if key_name in self._consolidated:
+            return self._consolidated[key_name]
+        if self.num_shards == 1:
+            array = self._load(0, key_name)
+        else:
+            temp_file = tempfile.NamedTemporaryFile(suffix=".npy")
+            self._temp_files.append(temp_file)
+            array = np.lib.format.open_memmap(temp_file.name, mode="w+", dtype=np.dtype(dtype), shape=tuple(shape))
+            start = 0
+            for shard_number in range(self.num_shards):
+                shard_array = self._load(shard_number, key_name)
+                array[start:start + len(shard_array)] = shard_array
+                start += len(shard_array)
+            array.flush()
+            logging.info(f"Consolidated {self.num_shards} shards into a memory map of {array.nbytes} bytes")
+        self._consolidated[key_name] = array
+        return array
+
+    def features(self) -> np.ndarray:
+        try:
+            return self._consolidate("features_key", self.index["features_shape"], self.index["features_dtype"])
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def target(self) -> np.ndarray:
+        try:
+            # indexes written before the target shape was recorded only held 1-D targets
+            return self._consolidate("target_key", self.index.get("target_shape", [self.rows]), self.index["target_dtype"])
+        except Exception as e:
+            raise NycException(e, sys) from e
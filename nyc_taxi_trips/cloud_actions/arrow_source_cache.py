@@ -0,0 +1,114 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pyarrow as pa
+from pandas import DataFrame
+
+from nyc_taxi_trips.logger import logging
+
+
+class ArrowIpcSink:
+    """
+    Appends dataframe chunks to an Arrow IPC file. The schema is fixed by the first chunk and
+    dictionary columns are stored decoded, since an IPC file holds one dictionary per column.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = pa.OSFile(path, "wb")
+        self.writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+        self.schema: Optional[pa.Schema] = None
+        self.rows = 0
+
+    def write(self, df: DataFrame) -> None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            fields = [pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                      for field in table.schema]
+            self.schema = pa.schema(fields, metadata=table.schema.metadata)
+            self.writer = pa.ipc.new_file(self.file, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+        self.rows += table.num_rows
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.file.close()
+
+
+class ArrowSourceCache:
+    """
+    Local Arrow IPC copies of source files, keyed by bucket, key, ETag and a hash of the parse plan
+    (the dtype plan and the schema columns). A source is parsed from CSV once; later reads memory
+    map its copy, so a changed source or a changed schema.yaml is never served stale and an
+    unchanged one is never parsed again. Older copies of a source are removed when a new one is
+    stored.
+    """
+
+    PARTIAL_SUFFIX = ".part"
+
+    def __init__(self, cache_dir: str, parse_plan: Optional[dict] = None):
+        self.cache_dir = cache_dir
+        self.plan_hash = hashlib.sha256(json.dumps(parse_plan, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def source_name(bucket_name: str, key: str) -> str:
+        return hashlib.sha256(f"{bucket_name}/{key}".encode()).hexdigest()[:32]
+
+    def path(self, bucket_name: str, key: str, etag: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.source_name(bucket_name, key)}-{self.plan_hash}-"
+                                            f"{re.sub(r'[^0-9A-Za-z-]', '', etag)}.arrow")
+
+    def get(self, bucket_name: str, key: str, etag: str) -> Optional[str]:
+        """
+        Path of the copy of the source with this ETag parsed with this plan, or None when there is none
+        """
+        path = self.path(bucket_name, key, etag)
+        return path if os.path.exists(path) else None
+
+    @contextmanager
+    def writer(self, bucket_name: str, key: str, etag: str) -> Iterator[ArrowIpcSink]:
+        """
+        Yields a sink for the chunks of the source. The copy only becomes visible when the context
+        exits without error, so an interrupted parse never leaves a truncated copy behind.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=self.PARTIAL_SUFFIX)
+        os.close(fd)
+        sink = ArrowIpcSink(temp_path)
+        try:
+            yield sink
+            sink.close()
+            path = self.path(bucket_name, key, etag)
+            os.replace(temp_path, path)
+            for stale_path in glob.glob(os.path.join(self.cache_dir, f"{self.source_name(bucket_name, key)}-*.arrow")):
+                if stale_path != path:
+                    os.remove(stale_path)
+            logging.info(f"Cached {sink.rows} rows of s3://{bucket_name}/{key} as Arrow IPC in {path}")
+        finally:
+            sink.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def read_table(path: str) -> pa.Table:
+        """
+        The whole copy as a table backed by a memory map of the file, no data is read up front
+        """
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    @classmethod
+    def iter_chunks(cls, path: str, chunk_size: int) -> Iterator[DataFrame]:
+        """
+        Yields the copy as dataframes of chunk_size rows; only one chunk is converted at a time
+        """
+        table = cls.read_table(path)
+        for start in range(0, table.num_rows, chunk_size):
+            yield table.slice(start, chunk_size).to_pandas()
@@ -1,47 +1,154 @@
 import boto3
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 import pyarrow.parquet as pq
-from nyc_taxi_trips.configuration.aws_connect import S3Client
-from io import StringIO
-from typing import Union,List
-import os,sys
+from nyc_taxi_trips.cloud_actions.s3_reader import S3RangeReader, Filters, read_parquet_table
+from nyc_taxi_trips.cloud_actions.s3_cache import S3DiskCache, HeadMemo
+from nyc_taxi_trips.cloud_actions.storage_backend import StorageBackend, StoredBucket, StoredObject, get_storage_backend
+from nyc_taxi_trips.cloud_actions.source_listing import SourceLister
+from nyc_taxi_trips.cloud_actions.array_shards import ShardedArrays, build_shard_index
+from nyc_taxi_trips.cloud_actions.parquet_dataset import PartitionedDatasetWriter, DatasetReader, DATASET_MANIFEST_VERSION
+from nyc_taxi_trips.entity.config_entity import S3TransferConfig, S3CacheConfig, SourceListingConfig, ParquetEncodingConfig
+from io import BytesIO, StringIO
+from typing import Union,List,Iterator,Optional
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os,sys,tempfile
 from nyc_taxi_trips.logger import logging
-from mypy_boto3_s3.service_resource import Bucket
 from nyc_taxi_trips.exception import NycException
-from botocore.exceptions import ClientError
 from pandas import DataFrame,read_csv
 import pickle
-from nyc_taxi_trips.utils.main_utils import save_numpy_array_data, save_object, load_numpy_array_data, load_object
+import json
+import dill
+from nyc_taxi_trips.constants import S3_SPOOL_MAX_MEMORY_SIZE, S3_BULK_MAX_WORKERS, ARRAY_SHARD_ROWS, \
+    DATA_INGESTION_MAX_OPEN_PARTITION_FILES, DATA_INGESTION_MAX_ROWS_PER_FILE
+from datetime import datetime, timezone
+
+
+def parquet_writer_options(encoding: ParquetEncodingConfig, schema: pa.Schema) -> dict:
+    """
+    Returns the pyarrow ParquetWriter options for the encoding. Dictionary columns that are not
+    in the schema are ignored, and so is the compression level for codecs without levels.
+    """
+    use_dictionary = True
+    if encoding.dictionary_columns is not None:
+        use_dictionary = [column for column in encoding.dictionary_columns if column in schema.names] or False
+    codec = encoding.compression.lower()
+    compression_level = encoding.compression_level
+    if codec == "none" or not pa.Codec.supports_compression_level(codec):
+        compression_level = None
+    return {"compression": encoding.compression, "compression_level": compression_level,
+            "use_dictionary": use_dictionary}
+
+
+class ParquetChunkWriter:
+    """
+    Appends dataframe chunks to a single parquet file. The schema is fixed by the first chunk
+    and every later chunk is cast to it, so chunks parsed independently stay compatible.
+    Codec, dictionary encoding and row group size come from the ParquetEncodingConfig.
+    """
+
+    def __init__(self, sink, encoding: ParquetEncodingConfig = ParquetEncodingConfig()):
+        self.sink = sink
+        self.encoding = encoding
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.rows = 0
+
+    def write(self, df: DataFrame) -> None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.sink, table.schema, **parquet_writer_options(self.encoding, table.schema))
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table, row_group_size=self.encoding.row_group_size)
+        self.rows += table.num_rows
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+@dataclass
+class TransferRequest:
+    """
+    One artifact transfer for SimpleStorageService.get_many / put_many. kind is "parquet", "array",
+    "object" or "shards", or "parquet_metadata" for footer reads; obj is the value to upload for put_many (a (features, target) pair for
+    shards) and options are passed to the single object method, e.g. columns and filters for
+    parquet reads.
+    """
+    kind: str
+    bucket_name: str
+    key: str
+    obj: object = None
+    options: dict = field(default_factory=dict)
 
 
 class SimpleStorageService:
 
-    def __init__(self):
-        s3_client = S3Client()
-        self.s3_resource = s3_client.s3_resource
-        self.s3_client = s3_client.s3_client
+    def __init__(self, spool_max_size: int = S3_SPOOL_MAX_MEMORY_SIZE, transfer_config: S3TransferConfig = S3TransferConfig(),
+                 cache_config: S3CacheConfig = S3CacheConfig(), backend: Optional[StorageBackend] = None):
+        self.backend = backend or get_storage_backend(transfer_config)
+        self.s3_client = getattr(self.backend, "s3_client", None)
+        self.transfer = getattr(self.backend, "transfer", None)
+        self.limiter = getattr(self.backend, "limiter", None)
+        self.spool_max_size = spool_max_size
+        self.cache = None
+        if cache_config.enabled and not self.backend.is_local:
+            self.cache = S3DiskCache.shared(cache_config.cache_dir, cache_config.max_bytes)
+        self.head_memo = HeadMemo.shared()
+
+    @property
+    def s3_resource(self):
+        return getattr(self.backend, "s3_resource", None)
+
+    def head_object(self, bucket_name: str, key: str) -> Optional[dict]:
+        """
+        Returns the metadata (key, size, etag, last_modified) of the object with exactly this key,
+        or None when it does not exist. Results are memoized for a few seconds.
+        """
+        try:
+            return self.head_memo.get_or_fetch(self.backend.name, bucket_name, key,
+                                               lambda: self.backend.head(bucket_name, key))
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def _written(self, bucket_name: str, key: str) -> None:
+        self.head_memo.invalidate(self.backend.name, bucket_name, key)
 
     def s3_key_path_available(self,bucket_name,s3_key)->bool:
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=s3_key)]
-            if len(file_objects) > 0:
-                return True
-            else:
-                return False
+            return self.head_object(bucket_name, s3_key) is not None
         except Exception as e:
             raise NycException(e,sys)
 
 
-    def give_s3_files(self, bucket_name):
+    def list_source_manifest(self, bucket_name: str, prefix: str = "", suffix: str = ".csv", refresh: bool = False,
+                             listing_config: SourceListingConfig = SourceListingConfig()) -> List[dict]:
+        """
+        Method Name :   list_source_manifest
+        Description :   This method lists every object in bucket_name bucket below prefix, following
+                        pagination and fanning out over sub folders, with a locally cached manifest
+
+        Output      :   List of dicts with key, size, etag and last_modified, ordered by key
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            return SourceLister(self.backend, listing_config).list(bucket_name, prefix=prefix, suffix=suffix, refresh=refresh)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def give_s3_files(self, bucket_name, refresh: bool = False):
+        """
+        Returns the file names, without their folders, of the csv objects in bucket_name. Use
+        list_source_manifest for the full keys.
+        """
         try:
             files = list()
-            response = self.s3_client.list_objects_v2(Bucket=bucket_name, Prefix='')
-            file_keys = [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.csv')]
-            for file_key in file_keys:
-                files.append(os.path.basename(file_key))
-                logging.info(f"{file_key} has been pushed to the files list")
+            for item in self.list_source_manifest(bucket_name, suffix='.csv', refresh=refresh):
+                files.append(os.path.basename(item['key']))
+                logging.info(f"{item['key']} has been pushed to the files list")
             
             return files
         except Exception as e:
@@ -75,10 +182,10 @@ class SimpleStorageService:
         except Exception as e:
             raise NycException(e, sys) from e
 
-    def get_bucket(self, bucket_name: str) -> Bucket:
+    def get_bucket(self, bucket_name: str) -> StoredBucket:
         """
         Method Name :   get_bucket
-        Description :   This method gets the bucket object based on the bucket_name
+        Description :   This method gets the bucket object based on the bucket_name, on any storage backend
 
         Output      :   Bucket object is returned based on the bucket name
         On Failure  :   Write an exception log and then raise an exception
@@ -89,16 +196,16 @@ class SimpleStorageService:
         logging.info("Entered the get_bucket method of S3Operations class")
 
         try:
-            bucket = self.s3_resource.Bucket(bucket_name)
+            bucket = StoredBucket(self.backend, bucket_name)
             logging.info("Exited the get_bucket method of S3Operations class")
             return bucket
         except Exception as e:
             raise NycException(e, sys) from e
 
-    def get_file_object( self, filename: str, bucket_name: str) -> Union[List[object], object]:
+    def get_file_object( self, filename: str, bucket_name: str) -> Union[List[StoredObject], StoredObject]:
         """
         Method Name :   get_file_object
-        Description :   This method gets the file object from bucket_name bucket based on filename
+        Description :   This method gets the file object from bucket_name bucket based on filename, on any storage backend
 
         Output      :   list of objects or object is returned based on filename
         On Failure  :   Write an exception log and then raise an exception
@@ -109,6 +216,11 @@ class SimpleStorageService:
         logging.info("Entered the get_file_object method of S3Operations class")
 
         try:
+            metadata = self.head_object(bucket_name, filename)
+            if metadata is not None:
+                logging.info("Exited the get_file_object method of S3Operations class")
+                return StoredObject(self.backend, bucket_name, metadata)
+
             bucket = self.get_bucket(bucket_name)
 
             file_objects = [file_object for file_object in bucket.objects.filter(Prefix=filename)]
@@ -143,9 +255,14 @@ class SimpleStorageService:
                 else model_dir + "/" + model_name
             )
             model_file = func()
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            model_key = self.resolve_key(model_file, bucket_name)
+            with self.local_copy(bucket_name, model_key) as local_path:
+                if local_path is not None:
+                    with open(local_path, "rb") as file_obj:
+                        model = pickle.load(file_obj)
+                else:
+                    with self.download_to_buffer(bucket_name, model_key) as buffer:
+                        model = pickle.load(buffer)
             logging.info("Exited the load_model method of S3Operations class")
             return model
 
@@ -165,16 +282,19 @@ class SimpleStorageService:
         """
         logging.info("Entered the create_folder method of S3Operations class")
 
-        try:
-            self.s3_resource.Object(bucket_name, folder_name).load()
+        if self.backend.is_local:
+            os.makedirs(self.backend.local_path(bucket_name, folder_name), exist_ok=True)
+            logging.info("Exited the create_folder method of S3Operations class")
+            return
 
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "404":
+        try:
+            if self.head_object(bucket_name, folder_name) is None:
                 folder_obj = folder_name + "/"
-                self.s3_client.put_object(Bucket=bucket_name, Key=folder_obj)
-            else:
-                pass
+                self.backend.upload_fileobj(BytesIO(), bucket_name, folder_obj)
+                self._written(bucket_name, folder_obj)
             logging.info("Exited the create_folder method of S3Operations class")
+        except Exception as e:
+            raise NycException(e, sys) from e
 
     def upload_file(self, from_filename: str, to_filename: str,  bucket_name: str,  remove: bool = True):
         """
@@ -194,9 +314,8 @@ class SimpleStorageService:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
-            self.s3_resource.meta.client.upload_file(
-                from_filename, bucket_name, to_filename
-            )
+            self.backend.upload_file(from_filename, bucket_name, to_filename)
+            self._written(bucket_name, to_filename)
 
             logging.info(
                 f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} bucket"
@@ -273,77 +392,332 @@ class SimpleStorageService:
         logging.info("Entered the read_csv method of S3Operations class")
 
         try:
-            par_obj = self.get_file_object(filename, bucket_name)
-            df = self.get_df_from_object(par_obj)
+            with self.backend.open_stream(bucket_name, self.resolve_key(filename, bucket_name)) as body:
+                df = read_csv(body)
             logging.info("Exited the read_csv method of S3Operations class")
             return df
         except Exception as e:
             raise NycException(e, sys) from e
-        
+
+    def read_csv_chunks(self, filename: str, bucket_name: str, chunksize: int, dtype: Optional[dict] = None) -> Iterator[DataFrame]:
+        """
+        Method Name :   read_csv_chunks
+        Description :   This method streams the filename csv object from bucket_name bucket and parses it
+                        chunk by chunk, so only one chunk of the file is held in memory at a time
+
+        Output      :   Iterator of dataframes with at most chunksize rows each
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the read_csv_chunks method of S3Operations class")
+
+        try:
+            body = self.backend.open_stream(bucket_name, self.resolve_key(filename, bucket_name))
+            with body, read_csv(body, chunksize=chunksize, dtype=dtype) as reader:
+                for chunk_number, chunk in enumerate(reader):
+                    logging.info(f"Read chunk {chunk_number} of {filename} with {len(chunk)} rows")
+                    yield chunk
+            logging.info("Exited the read_csv_chunks method of S3Operations class")
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def new_buffer(self) -> tempfile.SpooledTemporaryFile:
+        """
+        Returns an in-memory buffer for one transfer. The buffer spills to a unique anonymous
+        temporary file once it grows beyond spool_max_size bytes.
+        """
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+
+    def download_to_buffer(self, source_bucket_name: str, source_file_key: str) -> tempfile.SpooledTemporaryFile:
+        """
+        Downloads the source object into a new buffer positioned at its start.
+        The caller owns the buffer and is responsible for closing it.
+        """
+        buffer = self.new_buffer()
+        try:
+            self.backend.download_fileobj(source_bucket_name, source_file_key, buffer)
+            buffer.seek(0)
+            return buffer
+        except Exception as e:
+            buffer.close()
+            raise NycException(e, sys) from e
+
+    def upload_from_buffer(self, buffer, target_bucket_name: str, target_key: str) -> None:
+        """
+        Uploads the whole content of buffer to the target S3 key.
+        """
+        try:
+            buffer.seek(0)
+            self.backend.upload_fileobj(buffer, target_bucket_name, target_key)
+            self._written(target_bucket_name, target_key)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def resolve_key(self, filename: str, bucket_name: str) -> str:
+        """
+        Returns filename when it is the exact key of an object in bucket_name, else the key of the
+        first object whose key starts with filename
+        """
+        if self.head_object(bucket_name, filename) is not None:
+            return filename
+        file_objects = self.backend.list_objects(bucket_name, prefix=filename, max_keys=1)
+        if not file_objects:
+            raise Exception(f"No object found for {filename} in {bucket_name} bucket")
+        return file_objects[0]["key"]
+
+    @contextmanager
+    def local_copy(self, source_bucket_name: str, source_file_key: str, fetch: bool = True) -> Iterator[Optional[str]]:
+        """
+        Yields a local path the source object can be read or memory mapped from: the file itself
+        on the local backend, otherwise a copy from the read-through cache, downloaded on a miss
+        when fetch is True. A cached copy stays pinned against eviction until the context exits.
+        Yields None when the object is only reachable remotely, so partial reads pass fetch=False
+        and fall back to ranged reads instead of downloading the object.
+        """
+        local_path = self.backend.local_path(source_bucket_name, source_file_key)
+        if local_path is not None or self.cache is None:
+            yield local_path
+            return
+        etag = self.head_object(source_bucket_name, source_file_key)["etag"]
+        fetch_object = None
+        if fetch:
+            fetch_object = lambda path: self.backend.download_file(source_bucket_name, source_file_key, path)
+        with self.cache.open_entry(source_bucket_name, source_file_key, etag, fetch_object) as cached_path:
+            yield cached_path
+
+    @contextmanager
+    def open_parquet_writer(self, target_bucket_name: str, target_key: str,
+                            encoding: ParquetEncodingConfig = ParquetEncodingConfig()) -> Iterator[ParquetChunkWriter]:
+        """
+        Yields a ParquetChunkWriter that dataframe chunks can be appended to. The parquet file is
+        uploaded to s3://target_bucket_name/target_key when the context exits without error.
+        """
+        with self.new_buffer() as buffer:
+            writer = ParquetChunkWriter(buffer, encoding)
+            try:
+                yield writer
+                writer.close()
+                if writer.rows == 0:
+                    raise Exception(f"No rows were written for s3://{target_bucket_name}/{target_key}")
+                self.upload_from_buffer(buffer, target_bucket_name, target_key)
+                logging.info(f"Parquet file with {writer.rows} rows uploaded to s3://{target_bucket_name}/{target_key}")
+            except Exception as e:
+                raise NycException(e, sys) from e
+            finally:
+                writer.close()
+    
     
-    def read_parquet_from_s3(self, source_bucket_name, source_file_key):
+    def read_parquet_from_s3(self, source_bucket_name, source_file_key, columns: Optional[List[str]] = None, filters: Optional[Filters] = None):
         """
         Reads a Parquet file from the source S3 bucket and returns it as a DataFrame.
+
+        When columns or filters are given, only the footer, the requested column chunks and the
+        row groups whose min/max statistics can satisfy the filters are fetched with ranged GETs.
+        Filters use the pyarrow (column, op, value) form, e.g. [("passenger_count", ">", 0)].
+        Local files are memory mapped instead of read. Only full reads fill the local cache, a
+        projected or filtered read uses a cached copy when there already is one.
         """
         try:
-            # Download the parquet file to a local temporary path
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.parquet'
-            self.s3_client.download_file(source_bucket_name, source_file_key, temp_file_path)
-            # print(f"Parquet file {source_file_key} downloaded from {source_bucket_name}.")
-
-            # Read the parquet file into a DataFrame
-            df = pd.read_parquet(temp_file_path)
-            # print("Parquet file successfully read into a DataFrame.")
-            
-            # Clean up the temporary file
-            os.remove(temp_file_path)
+            projected = columns is not None or bool(filters)
+            with self.local_copy(source_bucket_name, source_file_key, fetch=not projected) as local_path:
+                if local_path is not None:
+                    with pa.memory_map(local_path) as source:
+                        df = read_parquet_table(source, columns=columns, filters=filters).to_pandas()
+                elif not projected:
+                    with self.download_to_buffer(source_bucket_name, source_file_key) as buffer:
+                        df = pd.read_parquet(buffer)
+                else:
+                    reader = S3RangeReader(self.backend, source_bucket_name, source_file_key)
+                    df = read_parquet_table(reader, columns=columns, filters=filters).to_pandas()
+                    logging.info(f"Fetched {reader.bytes_read} of {reader.size} bytes in {reader.requests} ranged requests")
+            logging.info(f"Parquet file s3://{source_bucket_name}/{source_file_key} read into a DataFrame")
             return df
         except Exception as e:
             raise NycException(e, sys) from e
+
+    def read_parquet_schema(self, source_bucket_name: str, source_file_key: str) -> pa.Schema:
+        """
+        Returns the arrow schema of a Parquet file in S3 by reading only its footer, with ranged
+        GETs unless a local copy already exists.
+        """
+        try:
+            with self.local_copy(source_bucket_name, source_file_key, fetch=False) as local_path:
+                if local_path is not None:
+                    with pa.memory_map(local_path) as source:
+                        return pq.read_schema(source)
+            reader = S3RangeReader(self.backend, source_bucket_name, source_file_key)
+            schema = pq.ParquetFile(reader).schema_arrow
+            logging.info(f"Read schema of s3://{source_bucket_name}/{source_file_key} from {reader.bytes_read} footer bytes")
+            return schema
+        except Exception as e:
+            raise NycException(e, sys) from e
+    
+
+    def read_parquet_metadata(self, source_bucket_name: str, source_file_key: str) -> pq.FileMetaData:
+        """
+        Returns the footer metadata of a Parquet file in S3: schema, row counts and the per row group
+        column statistics, by reading only the footer with ranged GETs unless a local copy already
+        exists.
+        """
+        try:
+            with self.local_copy(source_bucket_name, source_file_key, fetch=False) as local_path:
+                if local_path is not None:
+                    with pa.memory_map(local_path) as source:
+                        return pq.read_metadata(source)
+            reader = S3RangeReader(self.backend, source_bucket_name, source_file_key)
+            metadata = pq.ParquetFile(reader).metadata
+            logging.info(f"Read metadata of s3://{source_bucket_name}/{source_file_key} from {reader.bytes_read} footer bytes")
+            return metadata
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def iter_parquet_row_groups(self, source_bucket_name: str, source_file_key: str,
+                                columns: Optional[List[str]] = None) -> Iterator[DataFrame]:
+        """
+        Yields a Parquet file in S3 one row group at a time as DataFrames, fetching each row group
+        with ranged GETs only when it is reached, so memory is bounded by the row group size.
+        A cached local copy is memory mapped when there is one, the cache is not filled.
+        """
+        try:
+            with self.local_copy(source_bucket_name, source_file_key, fetch=False) as local_path:
+                source = pa.memory_map(local_path) if local_path is not None else \
+                    S3RangeReader(self.backend, source_bucket_name, source_file_key)
+                with source:
+                    parquet_file = pq.ParquetFile(source)
+                    for row_group_number in range(parquet_file.metadata.num_row_groups):
+                        yield parquet_file.read_row_group(row_group_number, columns=columns).to_pandas()
+        except Exception as e:
+            raise NycException(e, sys) from e
     
 
-    def write_parquet_to_s3(self, df, target_bucket_name, target_key):
+    def write_parquet_to_s3(self, df, target_bucket_name, target_key, encoding: ParquetEncodingConfig = ParquetEncodingConfig()):
         """
         Writes a DataFrame to a Parquet file and uploads it to the target S3 bucket in a specified folder.
         """
         try:
-            # Define the temporary local path to save the DataFrame as a Parquet file
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.parquet'
+            with self.new_buffer() as buffer:
+                writer = ParquetChunkWriter(buffer, encoding)
+                writer.write(df)
+                writer.close()
+                logging.info("DataFrame successfully written to a Parquet buffer.")
+                self.upload_from_buffer(buffer, target_bucket_name, target_key)
+            logging.info(f"Parquet file uploaded to s3://{target_bucket_name}/{target_key}")
+        except Exception as e:
+            raise NycException(e, sys) from e
+    
 
-            # Write the DataFrame to a Parquet file
-            df.to_parquet(temp_file_path, engine='pyarrow')
-            logging.info("DataFrame successfully written to a Parquet file.")
+    @contextmanager
+    def open_dataset_writer(self, target_bucket_name: str, root_key: str, writer_id: str, partition_column: str,
+                            encoding: ParquetEncodingConfig = ParquetEncodingConfig(),
+                            max_open_files: int = DATA_INGESTION_MAX_OPEN_PARTITION_FILES,
+                            max_rows_per_file: int = DATA_INGESTION_MAX_ROWS_PER_FILE) -> Iterator[PartitionedDatasetWriter]:
+        """
+        Yields a PartitionedDatasetWriter that dataframe chunks of each split can be appended to.
+        The partition files still open are uploaded when the context exits without error and
+        dropped otherwise; writer.files lists every uploaded file for the dataset manifest.
+        """
+        writer = PartitionedDatasetWriter(self, target_bucket_name, root_key, writer_id, partition_column,
+                                          encoding, max_open_files, max_rows_per_file)
+        try:
+            yield writer
+            writer.close()
+            logging.info(f"Wrote {writer.rows} rows in {len(writer.files)} partition files below s3://{target_bucket_name}/{root_key}")
+        except Exception as e:
+            writer.abort()
+            raise NycException(e, sys) from e
 
-            # Define the target S3 key (folder and file name) for the uploaded file
-            # target_key = f"{target_folder_name}/{target_file_name}"
+    def load_json(self, source_bucket_name: str, source_file_key: str):
+        """
+        Reads a JSON document from the source S3 bucket.
+        """
+        try:
+            with self.download_to_buffer(source_bucket_name, source_file_key) as buffer:
+                return json.load(buffer)
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-            # Upload the Parquet file to the target S3 bucket
-            self.s3_client.upload_file(temp_file_path, target_bucket_name, target_key)
-            logging.info(f"Parquet file uploaded to s3://{target_bucket_name}/{target_key}")
+    def save_json(self, obj, target_bucket_name: str, target_key: str) -> None:
+        """
+        Writes obj as a JSON document to the target S3 key.
+        """
+        try:
+            with self.new_buffer() as buffer:
+                buffer.write(json.dumps(obj, indent=1).encode())
+                self.upload_from_buffer(buffer, target_bucket_name, target_key)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def load_dataset_manifest(self, bucket_name: str, manifest_key: str) -> Optional[dict]:
+        """
+        Returns the manifest of a partitioned parquet dataset, or None when there is none yet
+        """
+        try:
+            if self.head_object(bucket_name, manifest_key) is None:
+                return None
+            manifest = self.load_json(bucket_name, manifest_key)
+            if manifest.get("version") != DATASET_MANIFEST_VERSION:
+                raise Exception(f"Unsupported dataset manifest version {manifest.get('version')}")
+            return manifest
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-            # Clean up the temporary file
-            os.remove(temp_file_path)
+    def save_dataset_manifest(self, manifest: dict, bucket_name: str, manifest_key: str) -> None:
+        try:
+            manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self.save_json(manifest, bucket_name, manifest_key)
+            logging.info(f"Saved the manifest of {len(manifest['files'])} dataset files to s3://{bucket_name}/{manifest_key}")
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def load_dataset(self, bucket_name: str, manifest_key: str) -> DatasetReader:
+        """
+        Method Name :   load_dataset
+        Description :   This method reads the manifest of the partitioned parquet dataset at manifest_key;
+                        the files it lists are only read when the returned reader is scanned
+
+        Output      :   DatasetReader over the dataset
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            manifest = self.load_dataset_manifest(bucket_name, manifest_key)
+            if manifest is None:
+                raise Exception(f"No dataset manifest at s3://{bucket_name}/{manifest_key}")
+            return DatasetReader(self, bucket_name, manifest)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def list_keys(self, bucket_name: str, prefix: str = "") -> List[str]:
+        """
+        Returns the keys of the objects below prefix as they are now, without the source manifest cache
+        """
+        try:
+            return [item["key"] for item in self.backend.list_objects(bucket_name, prefix=prefix)]
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def delete_objects(self, bucket_name: str, keys: List[str]) -> None:
+        try:
+            self.backend.delete_objects(bucket_name, keys)
+            for key in keys:
+                self._written(bucket_name, key)
+            logging.info(f"Deleted {len(keys)} objects from {bucket_name} bucket")
         except Exception as e:
             raise NycException(e, sys) from e
-    
 
     def upload_object_to_folder(self, obj: object, bucket_name, target_key):
         """
         Uploads a file to a specified folder in an S3 bucket.
 
         Parameters:
-        - file_path (str): The path to the file to upload.
+        - obj (object): The object to serialize and upload.
         - bucket_name (str): The name of the target S3 bucket.
-        - folder_name (str): The folder in the S3 bucket where the file should be uploaded.
+        - target_key (str): The key in the S3 bucket where the object should be uploaded.
         """
 
         try:
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.pkl'
-            save_object(temp_file_path, obj)
-            # Upload the file
-            self.s3_client.upload_file(temp_file_path, bucket_name, target_key)
-            logging.info(f"File {temp_file_path} uploaded to s3://{bucket_name}/{target_key}")
-            os.remove(temp_file_path)
+            with self.new_buffer() as buffer:
+                dill.dump(obj, buffer)
+                self.upload_from_buffer(buffer, bucket_name, target_key)
+            logging.info(f"Object uploaded to s3://{bucket_name}/{target_key}")
         except Exception as e:
             raise NycException(e, sys) from e 
         
@@ -353,76 +727,188 @@ class SimpleStorageService:
         Uploads a file to a specified folder in an S3 bucket.
 
         Parameters:
-        - file_path (str): The path to the file to upload.
+        - array (np.array): The array to save as .npy and upload.
         - bucket_name (str): The name of the target S3 bucket.
-        - target_key (str): The folder in the S3 bucket where the file should be uploaded.
+        - target_key (str): The key in the S3 bucket where the array should be uploaded.
         """
 
         try:
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.npy'
-            save_numpy_array_data(temp_file_path, array)
-            # Upload the file
-            self.s3_client.upload_file(temp_file_path, bucket_name, target_key)
-            logging.info(f"File {temp_file_path} uploaded to s3://{bucket_name}/{target_key}")
-            os.remove(temp_file_path)
+            with self.new_buffer() as buffer:
+                np.save(buffer, array)
+                self.upload_from_buffer(buffer, bucket_name, target_key)
+            logging.info(f"Array uploaded to s3://{bucket_name}/{target_key}")
         except Exception as e:
             raise NycException(e, sys) from e
     
 
 
 
-    def load_array_from_s3(self, source_bucket_name, source_file_key):
+    def load_array_from_s3(self, source_bucket_name, source_file_key, mmap_mode: Optional[str] = "r"):
         """
-        Reads a Parquet file from the source S3 bucket and returns it as a DataFrame.
+        Reads a .npy file from the source S3 bucket and returns it as a numpy array.
+        When a local copy exists the array is memory mapped with mmap_mode instead of read into memory.
         """
         try:
-            # Download the parquet file to a local temporary path
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.npy'
-            self.s3_client.download_file(source_bucket_name, source_file_key, temp_file_path)
-            # print(f"Parquet file {source_file_key} downloaded from {source_bucket_name}.")
-
-            # Read the parquet file into a DataFrame
-            arr = load_numpy_array_data(temp_file_path)
-            # print("Parquet file successfully read into a DataFrame.")
-            
-            # Clean up the temporary file
-            os.remove(temp_file_path)
+            with self.local_copy(source_bucket_name, source_file_key) as local_path:
+                if local_path is not None:
+                    # the memory map outlives the pin, an evicted file stays readable through it
+                    return np.load(local_path, mmap_mode=mmap_mode)
+            with self.download_to_buffer(source_bucket_name, source_file_key) as buffer:
+                arr = np.load(buffer)
             return arr
         except Exception as e:
             raise NycException(e, sys) from e
     
 
 
-    def load_object_from_s3(self, source_bucket_name, source_file_key):
+    def upload_array_shards(self, features: np.ndarray, target: np.ndarray, bucket_name: str, index_key: str,
+                            shard_rows: int = ARRAY_SHARD_ROWS) -> dict:
         """
-        Reads a Parquet file from the source S3 bucket and returns it as a DataFrame.
+        Method Name :   upload_array_shards
+        Description :   This method stores features and target as separate row shards of .npy files
+                        next to an index manifest at index_key. Shards are uploaded concurrently and
+                        the manifest last, so readers never see a partial artifact.
+
+        Output      :   The index manifest
+        On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            # Download the parquet file to a local temporary path
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.pkl'
-            self.s3_client.download_file(source_bucket_name, source_file_key, temp_file_path)
-            # print(f"Parquet file {source_file_key} downloaded from {source_bucket_name}.")
+            index, slices = build_shard_index(features, target, index_key, shard_rows)
+            requests = []
+            for features_key, target_key, rows in slices:
+                requests.append(TransferRequest("array", bucket_name, features_key, obj=features[rows]))
+                requests.append(TransferRequest("array", bucket_name, target_key, obj=target[rows]))
+            self.put_many(requests)
+            with self.new_buffer() as buffer:
+                buffer.write(json.dumps(index).encode())
+                self.upload_from_buffer(buffer, bucket_name, index_key)
+            logging.info(f"Uploaded {index['rows']} rows in {len(slices)} shards to s3://{bucket_name}/{index_key}")
+            return index
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-            # Read the parquet file into a DataFrame
-            obj = load_object(temp_file_path)
-            # print("Parquet file successfully read into a DataFrame.")
-            
-            # Clean up the temporary file
-            os.remove(temp_file_path)
+    def load_array_shards(self, bucket_name: str, index_key: str) -> ShardedArrays:
+        """
+        Method Name :   load_array_shards
+        Description :   This method reads the index manifest at index_key; the shards it lists are
+                        memory mapped lazily when the returned object is used
+
+        Output      :   ShardedArrays over the artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            with self.local_copy(bucket_name, index_key) as local_path:
+                if local_path is not None:
+                    with open(local_path) as index_file:
+                        index = json.load(index_file)
+                else:
+                    with self.download_to_buffer(bucket_name, index_key) as buffer:
+                        index = json.load(buffer)
+            return ShardedArrays(self, bucket_name, index)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def load_object_from_s3(self, source_bucket_name, source_file_key):
+        """
+        Reads a pickled object from the source S3 bucket and returns it.
+        """
+        try:
+            with self.local_copy(source_bucket_name, source_file_key) as local_path:
+                if local_path is not None:
+                    with open(local_path, "rb") as file_obj:
+                        return dill.load(file_obj)
+            with self.download_to_buffer(source_bucket_name, source_file_key) as buffer:
+                obj = dill.load(buffer)
             return obj
         except Exception as e:
             raise NycException(e, sys) from e
         
     
+    def copy_object(self, source_bucket_name: str, source_file_key: str, target_bucket_name: str, target_key: str) -> None:
+        """
+        Method Name :   copy_object
+        Description :   This method copies the source object to target_key in target_bucket_name bucket
+                        on the storage side, without downloading it, and verifies the copy
+
+        Output      :   Object is copied to the target bucket
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the copy_object method of S3Operations class")
+
+        try:
+            self.backend.copy_object(source_bucket_name, source_file_key, target_bucket_name, target_key)
+            self._written(target_bucket_name, target_key)
+            logging.info(f"Copied s3://{source_bucket_name}/{source_file_key} to s3://{target_bucket_name}/{target_key}")
+            logging.info("Exited the copy_object method of S3Operations class")
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def _run_many(self, requests: List[TransferRequest], handlers: dict, max_workers: int) -> list:
+        for request in requests:
+            if request.kind not in handlers:
+                raise Exception(f"Unknown transfer kind {request.kind}, expected one of {list(handlers)}")
+        if not requests:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests)), thread_name_prefix="s3-bulk") as executor:
+            return list(executor.map(lambda request: handlers[request.kind](request), requests))
+
+    def get_many(self, requests: List[TransferRequest], max_workers: int = S3_BULK_MAX_WORKERS) -> list:
+        """
+        Method Name :   get_many
+        Description :   This method fetches several artifacts concurrently on a bounded thread pool,
+                        so the wall clock time approaches that of the largest artifact
+
+        Output      :   List of the loaded artifacts, in the order of requests
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the get_many method of S3Operations class")
+
+        try:
+            handlers = {
+                "parquet": lambda request: self.read_parquet_from_s3(request.bucket_name, request.key, **request.options),
+                "parquet_metadata": lambda request: self.read_parquet_metadata(request.bucket_name, request.key),
+                "array": lambda request: self.load_array_from_s3(request.bucket_name, request.key, **request.options),
+                "object": lambda request: self.load_object_from_s3(request.bucket_name, request.key),
+                "shards": lambda request: self.load_array_shards(request.bucket_name, request.key),
+            }
+            results = self._run_many(requests, handlers, max_workers)
+            logging.info(f"Fetched {len(results)} artifacts concurrently")
+            logging.info("Exited the get_many method of S3Operations class")
+            return results
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def put_many(self, requests: List[TransferRequest], max_workers: int = S3_BULK_MAX_WORKERS) -> None:
+        """
+        Method Name :   put_many
+        Description :   This method uploads several artifacts concurrently on a bounded thread pool
+
+        Output      :   Every request.obj is stored at its bucket and key
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the put_many method of S3Operations class")
+
+        try:
+            handlers = {
+                "parquet": lambda request: self.write_parquet_to_s3(request.obj, request.bucket_name, request.key, **request.options),
+                "array": lambda request: self.upload_array_to_folder(request.obj, request.bucket_name, request.key),
+                "object": lambda request: self.upload_object_to_folder(request.obj, request.bucket_name, request.key),
+                "shards": lambda request: self.upload_array_shards(*request.obj, request.bucket_name, request.key, **request.options),
+            }
+            self._run_many(requests, handlers, max_workers)
+            logging.info(f"Uploaded {len(requests)} artifacts concurrently")
+            logging.info("Exited the put_many method of S3Operations class")
+        except Exception as e:
+            raise NycException(e, sys) from e
+
     def load_model_from_s3(self, source_bucket_name, source_file_key):
         """
-        Reads a Parquet file from the source S3 bucket and returns it as a DataFrame.
+        Downloads the source object to a unique local temporary file and returns its path.
         """
         try:
-            # Download the parquet file to a local temporary path
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.pkl'
-            self.s3_client.download_file(source_bucket_name, source_file_key, temp_file_path)
-            # print(f"Parquet file {source_file_key} downloaded from {source_bucket_name}.")
+            fd, temp_file_path = tempfile.mkstemp(suffix=os.path.splitext(source_file_key)[1])
+            os.close(fd)
+            self.backend.download_file(source_bucket_name, source_file_key, temp_file_path)
             return temp_file_path
         except Exception as e:
-            raise NycException(e, sys) from e
\ No newline at end of file
+            raise NycException(e, sys) from e
@@ -0,0 +1,253 @@
+import io
+import operator
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from nyc_taxi_trips.cloud_actions.s3_reader import Filters, normalize_filters
+from nyc_taxi_trips.entity.config_entity import ParquetEncodingConfig
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+DATASET_MANIFEST_VERSION = 1
+PARTITION_COLUMNS = ("year", "month")
+
+_OPERATORS = {"=": operator.eq, "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+              ">": operator.gt, ">=": operator.ge, "in": lambda value, values: value in values,
+              "not in": lambda value, values: value not in values}
+
+
+def partition_key(root_key: str, split: str, year: int, month: int) -> str:
+    return f"{root_key}/{split}/year={year:04d}/month={month:02d}"
+
+
+def new_manifest(partition_column: str, files: Optional[List[dict]] = None) -> dict:
+    return {"version": DATASET_MANIFEST_VERSION, "partitioning": list(PARTITION_COLUMNS),
+            "partition_column": partition_column, "files": files or []}
+
+
+def _split_partition_filters(conjunction: List[Tuple]) -> Tuple[List[Tuple], List[Tuple]]:
+    partition = [predicate for predicate in conjunction if predicate[0] in PARTITION_COLUMNS]
+    rows = [predicate for predicate in conjunction if predicate[0] not in PARTITION_COLUMNS]
+    return partition, rows
+
+
+def select_files(manifest: dict, split: str, filters: Optional[Filters] = None) -> List[Tuple[dict, Optional[Filters]]]:
+    """
+    Returns the files of split whose year/month partition can satisfy the filters, each with the
+    filters that are left to apply to its rows. Predicates on year and month are answered from the
+    manifest alone, so files of pruned partitions are never opened.
+    """
+    conjunctions = normalize_filters(filters)
+    selected = []
+    for entry in manifest["files"]:
+        if entry["split"] != split:
+            continue
+        if not conjunctions:
+            selected.append((entry, None))
+            continue
+        remaining = []
+        for conjunction in conjunctions:
+            partition_predicates, row_predicates = _split_partition_filters(conjunction)
+            if all(_OPERATORS[op](entry["partition"][column], value) for column, op, value in partition_predicates):
+                remaining.append(row_predicates)
+        if not remaining:
+            continue
+        # a conjunction without row predicates matches every row of the file
+        selected.append((entry, None if any(not conjunction for conjunction in remaining) else remaining))
+    return selected
+
+
+class _OpenPartitionFile:
+
+    def __init__(self, key: str, split: str, year: int, month: int, buffer, writer):
+        self.key = key
+        self.split = split
+        self.year = year
+        self.month = month
+        self.buffer = buffer
+        self.writer = writer
+        self.pending: List[DataFrame] = []
+        self.pending_rows = 0
+
+    @property
+    def rows(self) -> int:
+        return self.writer.rows + self.pending_rows
+
+    def append(self, df: DataFrame, row_group_size: int) -> None:
+        # small slices of a chunk are held back until they fill a row group
+        self.pending.append(df)
+        self.pending_rows += len(df)
+        if self.pending_rows >= row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.writer.write(pd.concat(self.pending, ignore_index=True) if len(self.pending) > 1 else self.pending[0])
+            self.pending, self.pending_rows = [], 0
+
+
+class PartitionedDatasetWriter:
+    """
+    Writes dataframe chunks of a split into a parquet dataset partitioned by the year and month of
+    partition_column, as <root_key>/<split>/year=YYYY/month=MM/part-<writer_id>-NNNNN.parquet.
+    At most max_open_files partition files are open at once, each in its own spool buffer with at
+    most one row group of rows held back; the least recently used one is uploaded when another is
+    needed, and files are rotated after max_rows_per_file rows, so memory stays bounded however
+    many partitions the source spans.
+    Rows whose partition column cannot be parsed go to year=0000/month=00.
+    """
+
+    def __init__(self, storage, bucket_name: str, root_key: str, writer_id: str, partition_column: str,
+                 encoding: ParquetEncodingConfig, max_open_files: int, max_rows_per_file: int):
+        from nyc_taxi_trips.cloud_actions.aws_actions import ParquetChunkWriter
+        self._chunk_writer_class = ParquetChunkWriter
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.root_key = root_key
+        self.writer_id = writer_id
+        self.partition_column = partition_column
+        self.encoding = encoding
+        self.max_open_files = max_open_files
+        self.max_rows_per_file = max_rows_per_file
+        self.files: List[dict] = []
+        self._open: "OrderedDict[Tuple[str, int, int], _OpenPartitionFile]" = OrderedDict()
+        self._sequence: Dict[Tuple[str, int, int], int] = {}
+
+    @property
+    def rows(self) -> int:
+        return sum(entry["rows"] for entry in self.files) + sum(open_file.rows for open_file in self._open.values())
+
+    def write(self, split: str, df: DataFrame) -> None:
+        if df.empty:
+            return
+        dates = pd.to_datetime(df[self.partition_column], errors="coerce")
+        years = dates.dt.year.fillna(0).astype("int64")
+        months = dates.dt.month.fillna(0).astype("int64")
+        for (year, month), part in df.groupby([years, months], sort=False):
+            open_file = self._file_for(split, int(year), int(month))
+            open_file.append(part, self.encoding.row_group_size)
+            if open_file.rows >= self.max_rows_per_file:
+                self._close_file(self._open.pop((split, int(year), int(month))))
+
+    def _file_for(self, split: str, year: int, month: int) -> _OpenPartitionFile:
+        partition = (split, year, month)
+        if partition in self._open:
+            self._open.move_to_end(partition)
+            return self._open[partition]
+        while len(self._open) >= self.max_open_files:
+            _, least_recent = self._open.popitem(last=False)
+            self._close_file(least_recent)
+        sequence = self._sequence.get(partition, 0)
+        self._sequence[partition] = sequence + 1
+        key = f"{partition_key(self.root_key, split, year, month)}/part-{self.writer_id}-{sequence:05d}.parquet"
+        buffer = self.storage.new_buffer()
+        self._open[partition] = _OpenPartitionFile(key, split, year, month, buffer,
+                                                   self._chunk_writer_class(buffer, self.encoding))
+        return self._open[partition]
+
+    def _close_file(self, open_file: _OpenPartitionFile) -> None:
+        try:
+            open_file.flush()
+            open_file.writer.close()
+            size = open_file.buffer.seek(0, io.SEEK_END)
+            self.storage.upload_from_buffer(open_file.buffer, self.bucket_name, open_file.key)
+            self.files.append({"key": open_file.key, "split": open_file.split,
+                               "partition": {"year": open_file.year, "month": open_file.month},
+                               "rows": open_file.writer.rows, "bytes": size})
+            logging.info(f"Uploaded {open_file.writer.rows} rows to s3://{self.bucket_name}/{open_file.key}")
+        finally:
+            open_file.buffer.close()
+
+    def close(self) -> None:
+        while self._open:
+            _, open_file = self._open.popitem(last=False)
+            self._close_file(open_file)
+
+    def abort(self) -> None:
+        while self._open:
+            _, open_file = self._open.popitem(last=False)
+            open_file.buffer.close()
+
+
+class DatasetReader:
+    """
+    Lazy scan of a partitioned parquet dataset through its manifest. Nothing is read until
+    iter_frames, iter_row_groups, read, metadata or schema is called, and then only the files of the
+    selected partitions.
+    """
+
+    def __init__(self, storage, bucket_name: str, manifest: dict):
+        if manifest.get("version") != DATASET_MANIFEST_VERSION:
+            raise Exception(f"Unsupported dataset manifest version {manifest.get('version')}")
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.manifest = manifest
+
+    def files(self, split: str, filters: Optional[Filters] = None) -> List[Tuple[dict, Optional[Filters]]]:
+        selected = select_files(self.manifest, split, filters)
+        total = sum(1 for entry in self.manifest["files"] if entry["split"] == split)
+        logging.info(f"Scanning {len(selected)} of {total} {split} files of the dataset")
+        return selected
+
+    def iter_frames(self, split: str, columns: Optional[List[str]] = None,
+                    filters: Optional[Filters] = None) -> Iterator[DataFrame]:
+        """
+        Yields the dataframe of each selected file in turn, so only one file is in memory at a time
+        """
+        for entry, file_filters in self.files(split, filters):
+            yield self.storage.read_parquet_from_s3(self.bucket_name, entry["key"], columns=columns, filters=file_filters)
+
+    def iter_row_groups(self, split: str, columns: Optional[List[str]] = None) -> Iterator[Tuple[dict, int, DataFrame]]:
+        """
+        Yields (manifest entry, row group number, dataframe) for every row group of split in turn,
+        so only one row group is in memory at a time
+        """
+        return self.iter_file_row_groups([entry for entry, _ in self.files(split)], columns=columns)
+
+    def iter_file_row_groups(self, entries: List[dict], columns: Optional[List[str]] = None) -> Iterator[Tuple[dict, int, DataFrame]]:
+        """
+        Yields (manifest entry, row group number, dataframe) for every row group of the given files
+        """
+        for entry in entries:
+            for row_group_number, df in enumerate(self.storage.iter_parquet_row_groups(self.bucket_name, entry["key"], columns=columns)):
+                yield entry, row_group_number, df
+
+    def metadata(self, split: str) -> List[Tuple[dict, pq.FileMetaData]]:
+        """
+        Reads the footer metadata of every file of split concurrently
+        """
+        from nyc_taxi_trips.cloud_actions.aws_actions import TransferRequest
+        entries = [entry for entry, _ in self.files(split)]
+        footers = self.storage.get_many([TransferRequest("parquet_metadata", self.bucket_name, entry["key"]) for entry in entries])
+        return list(zip(entries, footers))
+
+    def read(self, split: str, columns: Optional[List[str]] = None, filters: Optional[Filters] = None) -> DataFrame:
+        """
+        Reads the selected files of split concurrently into one dataframe
+        """
+        from nyc_taxi_trips.cloud_actions.aws_actions import TransferRequest
+        try:
+            selected = self.files(split, filters)
+            if not selected:
+                schema = self.schema(split)
+                df = schema.empty_table().to_pandas()
+                return df if columns is None else df[list(columns)]
+            frames = self.storage.get_many([
+                TransferRequest("parquet", self.bucket_name, entry["key"], options={"columns": columns, "filters": file_filters})
+                for entry, file_filters in selected
+            ])
+            return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def schema(self, split: str):
+        entries = [entry for entry in self.manifest["files"] if entry["split"] == split]
+        if not entries:
+            raise Exception(f"The dataset has no {split} files")
+        return self.storage.read_parquet_schema(self.bucket_name, entries[0]["key"])
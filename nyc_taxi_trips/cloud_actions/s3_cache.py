@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock, RLock
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the cache is then only safe within one process
+    fcntl = None
+
+from nyc_taxi_trips.constants import S3_HEAD_MEMO_TTL_SECONDS
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+class S3DiskCache:
+    """
+    Read-through local disk cache for S3 objects. Entries are keyed by bucket, key and ETag, so a
+    changed object is never served stale. The total size is capped and the least recently used
+    entries are evicted first. Hit, miss and eviction counters are kept per process.
+
+    The cache directory can be shared by several processes, e.g. the ingestion workers: updates of
+    the index are serialized by a file lock, an entry in use is pinned by a shared lock on its file
+    so no process evicts it, and concurrent misses on one entry download it only once.
+    """
+
+    INDEX_FILE_NAME = "index.json"
+    LOCK_FILE_NAME = "index.lock"
+    _shared: Dict[str, "S3DiskCache"] = {}
+    _shared_lock = RLock()
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = RLock()
+        self._fetch_locks: Dict[str, Lock] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def shared(cls, cache_dir: str, max_bytes: int) -> "S3DiskCache":
+        """
+        Returns the process wide cache for cache_dir, so counters add up across storage services
+        """
+        with cls._shared_lock:
+            cache = cls._shared.get(cache_dir)
+            if cache is None:
+                cache = cls._shared[cache_dir] = cls(cache_dir, max_bytes)
+            cache.max_bytes = max_bytes
+            return cache
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FILE_NAME)
+
+    @staticmethod
+    def entry_name(bucket_name: str, key: str, etag: str) -> str:
+        digest = hashlib.sha256(f"{bucket_name}/{key}@{etag}".encode()).hexdigest()
+        return digest + os.path.splitext(key)[1]
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[None]:
+        """
+        Holds the index of this process and, through a lock file, of every other process
+        """
+        with self._lock, open(os.path.join(self.cache_dir, self.LOCK_FILE_NAME), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _load_index(self) -> Dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as index_file:
+                return json.load(index_file)
+        except ValueError:
+            logging.info(f"Cache index {self.index_path} is unreadable, starting with an empty cache")
+            return {}
+
+    def _save_index(self, index: Dict[str, dict]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".index")
+        with os.fdopen(fd, "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(temp_path, self.index_path)
+
+    def _pin(self, name: str) -> Optional[BinaryIO]:
+        """
+        Returns the entry file opened with a shared lock, which keeps it from being evicted until
+        it is closed, or None when the entry is not on disk
+        """
+        path = os.path.join(self.cache_dir, name)
+        try:
+            entry_file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        if fcntl is not None:
+            fcntl.flock(entry_file, fcntl.LOCK_SH)
+        try:
+            # evicted between open and lock when the path no longer names the locked file
+            if os.path.samestat(os.fstat(entry_file.fileno()), os.stat(path)):
+                return entry_file
+        except FileNotFoundError:
+            pass
+        entry_file.close()
+        return None
+
+    def _remove(self, index: Dict[str, dict], name: str) -> bool:
+        """
+        Removes the entry unless it is pinned, returns whether it was removed
+        """
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as entry_file:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(entry_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return False
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        # a download waiting on the old lock file at worst repeats the download of a new one
+        try:
+            os.remove(path + ".lock")
+        except FileNotFoundError:
+            pass
+        index.pop(name, None)
+        return True
+
+    def _evict(self, index: Dict[str, dict], keep: str) -> None:
+        total = sum(entry["size"] for entry in index.values())
+        for name, entry in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            if not self._remove(index, name):
+                logging.info(f"Kept s3://{entry['bucket']}/{entry['key']} in the local cache, it is in use")
+                continue
+            total -= entry["size"]
+            self.evictions += 1
+            logging.info(f"Evicted s3://{entry['bucket']}/{entry['key']} from the local cache")
+
+    def _touch(self, bucket_name: str, key: str, etag: str, name: str) -> None:
+        with self._locked_index():
+            index = self._load_index()
+            for stale in [entry_name for entry_name, entry in index.items()
+                          if entry["bucket"] == bucket_name and entry["key"] == key and entry_name != name]:
+                self._remove(index, stale)
+            index[name] = {"bucket": bucket_name, "key": key, "etag": etag,
+                           "size": os.path.getsize(os.path.join(self.cache_dir, name)), "last_access": time.time()}
+            self._evict(index, keep=name)
+            self._save_index(index)
+
+    @contextmanager
+    def _fetch_lock(self, name: str) -> Iterator[None]:
+        """
+        Holds the download of one entry, for the threads of this process and through a lock file
+        next to the entry for other processes
+        """
+        with self._lock:
+            lock = self._fetch_locks.setdefault(name, Lock())
+        with lock, open(os.path.join(self.cache_dir, name + ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _fetch(self, bucket_name: str, key: str, etag: str, name: str, fetch: Callable[[str], None]) -> BinaryIO:
+        with self._fetch_lock(name):
+            entry_file = self._pin(name)
+            if entry_file is not None:
+                self.hits += 1
+                logging.info(f"Cache hit for s3://{bucket_name}/{key} after a concurrent download")
+                return entry_file
+
+            self.misses += 1
+            logging.info(f"Cache miss for s3://{bucket_name}/{key}")
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            os.close(fd)
+            try:
+                fetch(temp_path)
+                os.replace(temp_path, os.path.join(self.cache_dir, name))
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            return self._pin(name)
+
+    @contextmanager
+    def open_entry(self, bucket_name: str, key: str, etag: str,
+                   fetch: Optional[Callable[[str], None]] = None) -> Iterator[Optional[str]]:
+        """
+        Yields the local path of the cached object, pinned until the context exits, so it can be
+        opened or memory mapped safely. On a miss, fetch is called with a temporary path to
+        download the object to and the result is added to the cache; without fetch None is yielded.
+        """
+        name = self.entry_name(bucket_name, key, etag)
+        try:
+            entry_file = self._pin(name)
+            if entry_file is not None:
+                self.hits += 1
+                logging.info(f"Cache hit for s3://{bucket_name}/{key}")
+            elif fetch is not None:
+                entry_file = self._fetch(bucket_name, key, etag, name, fetch)
+            if entry_file is not None:
+                self._touch(bucket_name, key, etag, name)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+        if entry_file is None:
+            yield None
+            return
+        with entry_file:
+            yield os.path.join(self.cache_dir, name)
+
+    def stats(self) -> dict:
+        with self._locked_index():
+            index = self._load_index()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(index), "bytes": sum(entry["size"] for entry in index.values())}
+
+
+class HeadMemo:
+    """
+    Short lived, process wide memo of exact-key metadata lookups, including misses. Writes made
+    through SimpleStorageService invalidate their key, other changes are picked up after ttl_seconds.
+    """
+
+    _shared: Optional["HeadMemo"] = None
+    _shared_lock = RLock()
+
+    def __init__(self, ttl_seconds: float = S3_HEAD_MEMO_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str, str], Tuple[float, Optional[dict]]] = {}
+        self._lock = RLock()
+
+    @classmethod
+    def shared(cls) -> "HeadMemo":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get_or_fetch(self, backend_name: str, bucket_name: str, key: str,
+                     fetch: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """
+        Returns the memoized metadata of the object (None when it does not exist), calling fetch
+        when there is no entry younger than ttl_seconds
+        """
+        memo_key = (backend_name, bucket_name, key)
+        with self._lock:
+            entry = self._entries.get(memo_key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        metadata = fetch()
+        with self._lock:
+            self._entries[memo_key] = (time.monotonic() + self.ttl_seconds, metadata)
+        return metadata
+
+    def invalidate(self, backend_name: str, bucket_name: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((backend_name, bucket_name, key), None)
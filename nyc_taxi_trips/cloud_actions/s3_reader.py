@@ -0,0 +1,174 @@
+import io
+import sys
+from typing import List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+Filters = Union[List[Tuple], List[List[Tuple]]]
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a single stored object. Every read is served by ranged
+    reads of the storage backend, so readers such as pyarrow only download the byte ranges they
+    actually touch, and on S3 large ranges are fetched in concurrent parts.
+    """
+
+    def __init__(self, backend, bucket_name: str, key: str, size: Optional[int] = None):
+        super().__init__()
+        self.backend = backend
+        self.bucket_name = bucket_name
+        self.key = key
+        self.size = size if size is not None else backend.head(bucket_name, key)["size"]
+        self.position = 0
+        self.bytes_read = 0
+        self.requests = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self.position
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """
+        Returns the bytes in [start, end) of the object
+        """
+        if start >= end:
+            return b""
+        data = self.backend.read_range(self.bucket_name, self.key, start, end)
+        self.bytes_read += len(data)
+        self.requests += 1
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+        data = self.read_range(self.position, end)
+        self.position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def normalize_filters(filters: Optional[Filters]) -> List[List[Tuple]]:
+    """
+    Returns filters in disjunctive normal form: a list of conjunctions of (column, op, value) tuples
+    """
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        return [list(filters)]
+    return [list(conjunction) for conjunction in filters]
+
+
+def filter_columns(filters: Optional[Filters]) -> List[str]:
+    columns = []
+    for conjunction in normalize_filters(filters):
+        for column, _, _ in conjunction:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def _predicate_may_match(statistics, op: str, value) -> bool:
+    if statistics is None or not statistics.has_min_max:
+        return True
+    minimum, maximum = statistics.min, statistics.max
+    try:
+        if op in ("=", "=="):
+            return minimum <= value <= maximum
+        if op == "!=":
+            return not (minimum == maximum == value)
+        if op == "<":
+            return minimum < value
+        if op == "<=":
+            return minimum <= value
+        if op == ">":
+            return maximum > value
+        if op == ">=":
+            return maximum >= value
+        if op == "in":
+            return any(minimum <= item <= maximum for item in value)
+    except TypeError:
+        return True
+    return True
+
+
+def row_groups_matching(metadata: pq.FileMetaData, filters: Optional[Filters]) -> List[int]:
+    """
+    Returns the indices of the row groups whose min/max statistics do not rule out every conjunction
+    of the filters. Row groups that are skipped here are never downloaded.
+    """
+    conjunctions = normalize_filters(filters)
+    if not conjunctions:
+        return list(range(metadata.num_row_groups))
+
+    column_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+    matching = []
+    for row_group_number in range(metadata.num_row_groups):
+        row_group = metadata.row_group(row_group_number)
+        for conjunction in conjunctions:
+            if all(
+                column not in column_index
+                or _predicate_may_match(row_group.column(column_index[column]).statistics, op, value)
+                for column, op, value in conjunction
+            ):
+                matching.append(row_group_number)
+                break
+    return matching
+
+
+def read_parquet_table(source, columns: Optional[Sequence[str]] = None, filters: Optional[Filters] = None) -> pa.Table:
+    """
+    Reads the parquet source with column projection and row filters. Row groups are first pruned
+    using their statistics, the remaining ones are read with only the projected and filter columns,
+    and the filters are then applied row by row.
+    """
+    try:
+        parquet_file = pq.ParquetFile(source, pre_buffer=True)
+        row_groups = row_groups_matching(parquet_file.metadata, filters)
+        logging.info(f"Reading {len(row_groups)} of {parquet_file.metadata.num_row_groups} row groups")
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns) + [column for column in filter_columns(filters) if column not in columns]
+
+        if row_groups:
+            table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+        else:
+            table = parquet_file.schema_arrow.empty_table()
+            if read_columns is not None:
+                table = table.select(read_columns)
+
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(list(columns))
+        return table
+    except Exception as e:
+        raise NycException(e, sys) from e
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from nyc_taxi_trips.cloud_actions.storage_backend import StorageBackend
+from nyc_taxi_trips.entity.config_entity import SourceListingConfig
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+class SourceLister:
+    """
+    Lists every object of a source bucket, following pagination, as a manifest of key, size, etag
+    and last_modified entries. The listing fans out over the first fan_out_depth levels of "folders"
+    (e.g. year/month) so their pages are fetched concurrently, and the manifest is cached on local
+    disk for ttl_seconds so repeated pipeline runs do not re-list the bucket.
+    """
+
+    def __init__(self, backend: StorageBackend, listing_config: SourceListingConfig = SourceListingConfig()):
+        self.backend = backend
+        self.listing_config = listing_config
+        os.makedirs(listing_config.manifest_dir, exist_ok=True)
+
+    def manifest_path(self, bucket_name: str, prefix: str, suffix: str) -> str:
+        digest = hashlib.sha256(f"{self.backend.name}|{prefix}|{suffix}|{self.listing_config.fan_out_depth}".encode()).hexdigest()
+        return os.path.join(self.listing_config.manifest_dir, f"{bucket_name}-{digest[:16]}.json")
+
+    def _load_cached(self, path: str) -> Optional[List[dict]]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except ValueError:
+            return None
+        age = time.time() - manifest["created_at"]
+        if age > self.listing_config.ttl_seconds:
+            logging.info(f"Source manifest {path} is {age:.0f}s old, listing again")
+            return None
+        return manifest["objects"]
+
+    def _save(self, path: str, objects: List[dict]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.listing_config.manifest_dir, suffix=".part")
+        with os.fdopen(fd, "w") as manifest_file:
+            json.dump({"created_at": time.time(), "objects": objects}, manifest_file)
+        os.replace(temp_path, path)
+
+    def _fan_out(self, bucket_name: str, prefix: str):
+        """
+        Returns the objects above the fan out depth and the prefixes to list in parallel below it
+        """
+        objects, prefixes = [], [prefix]
+        for _ in range(self.listing_config.fan_out_depth):
+            next_prefixes = []
+            for current in prefixes:
+                objects.extend(self.backend.list_objects(bucket_name, prefix=current, recursive=False))
+                next_prefixes.extend(self.backend.list_prefixes(bucket_name, prefix=current))
+            prefixes = next_prefixes
+        return objects, prefixes
+
+    def list(self, bucket_name: str, prefix: str = "", suffix: str = "", refresh: bool = False) -> List[dict]:
+        """
+        Returns the manifest of the objects below prefix whose key ends with suffix, ordered by key
+        """
+        try:
+            path = self.manifest_path(bucket_name, prefix, suffix)
+            if not refresh:
+                objects = self._load_cached(path)
+                if objects is not None:
+                    logging.info(f"Using cached source manifest {path} with {len(objects)} objects")
+                    return objects
+
+            objects, prefixes = self._fan_out(bucket_name, prefix)
+            if prefixes:
+                with ThreadPoolExecutor(max_workers=min(self.listing_config.max_workers, len(prefixes)),
+                                        thread_name_prefix="s3-list") as executor:
+                    for listed in executor.map(lambda current: self.backend.list_objects(bucket_name, prefix=current), prefixes):
+                        objects.extend(listed)
+
+            objects = sorted((item for item in objects if item["key"].endswith(suffix)), key=lambda item: item["key"])
+            self._save(path, objects)
+            logging.info(f"Listed {len(objects)} objects with {sum(item['size'] for item in objects)} bytes "
+                         f"in {bucket_name} over {len(prefixes)} prefixes")
+            return objects
+        except Exception as e:
+            raise NycException(e, sys) from e
@@ -0,0 +1,333 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional
+
+from botocore.exceptions import ClientError
+
+from nyc_taxi_trips.cloud_actions.transfer import TransferEngine
+from nyc_taxi_trips.configuration.aws_connect import S3Client
+from nyc_taxi_trips.constants import STORAGE_BACKEND_ENV_KEY, LOCAL_STORAGE_ROOT_ENV_KEY, LOCAL_STORAGE_ROOT
+from nyc_taxi_trips.entity.config_entity import S3TransferConfig, S3ConnectionConfig
+from nyc_taxi_trips.exception import NycException
+from nyc_taxi_trips.logger import logging
+
+
+class StorageBackend(ABC):
+    """
+    Byte level operations on bucket/key addressed objects that SimpleStorageService is built on.
+    Object metadata is returned as a dict with key, size, etag and last_modified.
+    """
+
+    name: str = ""
+
+    @property
+    def is_local(self) -> bool:
+        return False
+
+    def local_path(self, bucket_name: str, key: str) -> Optional[str]:
+        """
+        Path of the object on the local filesystem when the backend stores it there, else None
+        """
+        return None
+
+    @abstractmethod
+    def head(self, bucket_name: str, key: str) -> Optional[dict]:
+        """
+        Metadata of the object with exactly this key, or None when it does not exist
+        """
+
+    @abstractmethod
+    def list_objects(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None,
+                     recursive: bool = True) -> List[dict]:
+        """
+        Metadata of the objects whose key starts with prefix, ordered by key. With recursive=False
+        only the objects directly below prefix are returned, not those in its sub folders.
+        """
+
+    @abstractmethod
+    def list_prefixes(self, bucket_name: str, prefix: str = "") -> List[str]:
+        """
+        The "folders" directly below prefix, each ending with "/", ordered by key
+        """
+
+    @abstractmethod
+    def download_file(self, bucket_name: str, key: str, filename: str) -> None: ...
+
+    @abstractmethod
+    def upload_file(self, filename: str, bucket_name: str, key: str) -> None: ...
+
+    @abstractmethod
+    def download_fileobj(self, bucket_name: str, key: str, fileobj: BinaryIO) -> None: ...
+
+    @abstractmethod
+    def upload_fileobj(self, fileobj: BinaryIO, bucket_name: str, key: str) -> None: ...
+
+    @abstractmethod
+    def copy_object(self, source_bucket_name: str, source_key: str, bucket_name: str, key: str) -> None:
+        """
+        Copies the object within the backend and verifies the copy matches the source
+        """
+
+    @abstractmethod
+    def delete_objects(self, bucket_name: str, keys: List[str]) -> None:
+        """
+        Deletes the objects, ignoring keys that do not exist
+        """
+
+    @abstractmethod
+    def read_range(self, bucket_name: str, key: str, start: int, end: int) -> bytes:
+        """
+        Bytes in [start, end) of the object
+        """
+
+    @abstractmethod
+    def open_stream(self, bucket_name: str, key: str) -> BinaryIO:
+        """
+        Sequential read-only stream over the whole object
+        """
+
+
+class StoredObject:
+    """
+    Handle of one stored object with the parts of the boto3 Object interface the storage service
+    uses (key, bucket_name, content_length, e_tag and get()["Body"]), on any backend
+    """
+
+    def __init__(self, backend: StorageBackend, bucket_name: str, metadata: dict):
+        self.backend = backend
+        self.bucket_name = bucket_name
+        self.key = metadata["key"]
+        self.content_length = metadata["size"]
+        self.e_tag = metadata["etag"]
+
+    def get(self) -> dict:
+        return {"Body": self.backend.open_stream(self.bucket_name, self.key),
+                "ContentLength": self.content_length, "ETag": self.e_tag}
+
+
+class StoredBucket:
+    """
+    Handle of a bucket with the parts of the boto3 Bucket interface the storage service uses
+    (name and objects.filter(Prefix=...)), on any backend
+    """
+
+    class Objects:
+        def __init__(self, bucket: "StoredBucket"):
+            self.bucket = bucket
+
+        def filter(self, Prefix: str = "") -> List[StoredObject]:
+            return [StoredObject(self.bucket.backend, self.bucket.name, metadata)
+                    for metadata in self.bucket.backend.list_objects(self.bucket.name, prefix=Prefix)]
+
+    def __init__(self, backend: StorageBackend, name: str):
+        self.backend = backend
+        self.name = name
+        self.objects = self.Objects(self)
+
+
+class S3Backend(StorageBackend):
+    """
+    Objects in AWS S3 or an S3 compatible endpoint, moved by the TransferEngine
+    """
+
+    name = "s3"
+
+    def __init__(self, transfer_config: S3TransferConfig = S3TransferConfig(),
+                 connection_config: S3ConnectionConfig = S3ConnectionConfig()):
+        self.connection = S3Client(connection_config=connection_config)
+        self.s3_client = self.connection.s3_client
+        self.limiter = self.connection.limiter
+        self.transfer = TransferEngine(self.s3_client, transfer_config)
+
+    @property
+    def s3_resource(self):
+        return self.connection.s3_resource
+
+    def head(self, bucket_name: str, key: str) -> Optional[dict]:
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"key": key, "size": response["ContentLength"], "etag": response["ETag"],
+                "last_modified": response["LastModified"].isoformat()}
+
+    def list_objects(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None,
+                     recursive: bool = True) -> List[dict]:
+        objects = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pagination = {"MaxItems": max_keys} if max_keys else {}
+        delimiter = {} if recursive else {"Delimiter": "/"}
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig=pagination, **delimiter):
+            for item in page.get("Contents", []):
+                objects.append({"key": item["Key"], "size": item["Size"], "etag": item["ETag"],
+                                "last_modified": item["LastModified"].isoformat()})
+        return objects
+
+    def list_prefixes(self, bucket_name: str, prefix: str = "") -> List[str]:
+        prefixes = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter="/"):
+            prefixes.extend(item["Prefix"] for item in page.get("CommonPrefixes", []))
+        return prefixes
+
+    def download_file(self, bucket_name: str, key: str, filename: str) -> None:
+        self.transfer.download_file(bucket_name, key, filename)
+
+    def upload_file(self, filename: str, bucket_name: str, key: str) -> None:
+        self.transfer.upload_file(filename, bucket_name, key)
+
+    def download_fileobj(self, bucket_name: str, key: str, fileobj: BinaryIO) -> None:
+        self.transfer.download_fileobj(bucket_name, key, fileobj)
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket_name: str, key: str) -> None:
+        self.transfer.upload_fileobj(fileobj, bucket_name, key)
+
+    def copy_object(self, source_bucket_name: str, source_key: str, bucket_name: str, key: str) -> None:
+        self.transfer.copy_object(source_bucket_name, source_key, bucket_name, key)
+
+    def delete_objects(self, bucket_name: str, keys: List[str]) -> None:
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            response = self.s3_client.delete_objects(
+                Bucket=bucket_name, Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True})
+            if response.get("Errors"):
+                raise Exception(f"Could not delete {len(response['Errors'])} objects: {response['Errors'][:3]}")
+
+    def read_range(self, bucket_name: str, key: str, start: int, end: int) -> bytes:
+        return self.transfer.read_range(bucket_name, key, start, end)
+
+    def open_stream(self, bucket_name: str, key: str) -> BinaryIO:
+        return io.BufferedReader(self.transfer.open_stream(bucket_name, key), buffer_size=self.transfer.transfer_config.part_size)
+
+
+class LocalBackend(StorageBackend):
+    """
+    Objects stored as files under root_dir/<bucket>/<key>. Reads can memory map the files
+    directly, which takes network I/O out of the pipeline for development and benchmarks.
+    """
+
+    name = "local"
+    PARTIAL_SUFFIX = ".part"
+
+    def __init__(self, root_dir: str = LOCAL_STORAGE_ROOT):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    @property
+    def is_local(self) -> bool:
+        return True
+
+    def path(self, bucket_name: str, key: str) -> str:
+        return os.path.join(self.root_dir, bucket_name, *key.split("/"))
+
+    def local_path(self, bucket_name: str, key: str) -> Optional[str]:
+        return self.path(bucket_name, key)
+
+    @staticmethod
+    def _metadata(key: str, path: str) -> dict:
+        stat = os.stat(path)
+        return {"key": key, "size": stat.st_size, "etag": f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+                "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()}
+
+    def head(self, bucket_name: str, key: str) -> Optional[dict]:
+        path = self.path(bucket_name, key)
+        if not os.path.isfile(path):
+            return None
+        return self._metadata(key, path)
+
+    def list_objects(self, bucket_name: str, prefix: str = "", max_keys: Optional[int] = None,
+                     recursive: bool = True) -> List[dict]:
+        bucket_dir = os.path.join(self.root_dir, bucket_name)
+        start_dir = os.path.join(bucket_dir, *prefix.split("/")[:-1])
+        objects = []
+        for dir_path, dir_names, file_names in os.walk(start_dir):
+            if not recursive:
+                dir_names.clear()
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                key = os.path.relpath(path, bucket_dir).replace(os.sep, "/")
+                if key.startswith(prefix) and not file_name.endswith(self.PARTIAL_SUFFIX):
+                    objects.append(self._metadata(key, path))
+        objects.sort(key=lambda item: item["key"])
+        return objects[:max_keys] if max_keys else objects
+
+    def list_prefixes(self, bucket_name: str, prefix: str = "") -> List[str]:
+        bucket_dir = os.path.join(self.root_dir, bucket_name)
+        parent = prefix.rsplit("/", 1)[0] + "/" if "/" in prefix else ""
+        parent_dir = os.path.join(bucket_dir, *parent.split("/")[:-1])
+        if not os.path.isdir(parent_dir):
+            return []
+        return sorted(parent + name + "/" for name in os.listdir(parent_dir)
+                      if os.path.isdir(os.path.join(parent_dir, name)) and (parent + name).startswith(prefix))
+
+    def download_file(self, bucket_name: str, key: str, filename: str) -> None:
+        shutil.copyfile(self.path(bucket_name, key), filename)
+
+    def upload_file(self, filename: str, bucket_name: str, key: str) -> None:
+        with open(filename, "rb") as source:
+            self.upload_fileobj(source, bucket_name, key)
+
+    def download_fileobj(self, bucket_name: str, key: str, fileobj: BinaryIO) -> None:
+        with open(self.path(bucket_name, key), "rb") as source:
+            shutil.copyfileobj(source, fileobj)
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket_name: str, key: str) -> None:
+        path = self.path(bucket_name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=self.PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as target:
+                shutil.copyfileobj(fileobj, target)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def copy_object(self, source_bucket_name: str, source_key: str, bucket_name: str, key: str) -> None:
+        with open(self.path(source_bucket_name, source_key), "rb") as source:
+            self.upload_fileobj(source, bucket_name, key)
+        source_size = os.path.getsize(self.path(source_bucket_name, source_key))
+        copy_size = os.path.getsize(self.path(bucket_name, key))
+        if copy_size != source_size:
+            raise Exception(f"Copy of {source_key} to {key} has {copy_size} bytes, expected {source_size}")
+
+    def delete_objects(self, bucket_name: str, keys: List[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self.path(bucket_name, key))
+            except FileNotFoundError:
+                pass
+
+    def read_range(self, bucket_name: str, key: str, start: int, end: int) -> bytes:
+        with open(self.path(bucket_name, key), "rb") as source:
+            source.seek(start)
+            return source.read(max(0, end - start))
+
+    def open_stream(self, bucket_name: str, key: str) -> BinaryIO:
+        return open(self.path(bucket_name, key), "rb")
+
+
+def get_storage_backend(transfer_config: S3TransferConfig = S3TransferConfig()) -> StorageBackend:
+    """
+    Returns the backend selected by the STORAGE_BACKEND environment variable ("s3" or "local").
+    The local backend stores buckets under LOCAL_STORAGE_ROOT.
+    """
+    try:
+        backend_name = os.getenv(STORAGE_BACKEND_ENV_KEY, S3Backend.name).lower()
+        if backend_name == S3Backend.name:
+            return S3Backend(transfer_config)
+        if backend_name == LocalBackend.name:
+            root_dir = os.getenv(LOCAL_STORAGE_ROOT_ENV_KEY, LOCAL_STORAGE_ROOT)
+            logging.info(f"Using the local storage backend rooted at {root_dir}")
+            return LocalBackend(root_dir)
+        raise Exception(f"Unknown storage backend {backend_name}, expected {S3Backend.name} or {LocalBackend.name}")
+    except Exception as e:
+        raise NycException(e, sys) from e
@@ -0,0 +1,129 @@
+import time
+from collections import deque
+from threading import Condition
+
+from nyc_taxi_trips.logger import logging
+
+
+THROTTLE_ERROR_CODES = {"SlowDown", "ServiceUnavailable", "503", "Throttling", "ThrottlingException",
+                        "RequestLimitExceeded", "RequestThrottled", "TooManyRequestsException"}
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of S3 requests in flight. Every successful request widens the limit
+    by 1/limit (about one more slot per round of requests), and a throttled response (503 SlowDown
+    and friends) halves it, at most once for the requests that were already in flight when the
+    limit was last cut. Attached to a boto3 client it gates every API call, including the ones
+    made by the managed transfer threads and botocore's own retries.
+    """
+
+    CONTEXT_KEY = "adaptive_concurrency_started"
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, decrease_factor: float = 0.5,
+                 rate_window_seconds: float = 10.0):
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.rate_window_seconds = rate_window_seconds
+        self.in_flight = 0
+        self.requests = 0
+        self.throttles = 0
+        self.last_decrease = 0.0
+        self._completed = deque()
+        self._condition = Condition()
+
+    def acquire(self) -> float:
+        """
+        Waits for a free slot and returns the time the request started
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            now = time.monotonic()
+            self._completed.append(now)
+            while self._completed and self._completed[0] < now - self.rate_window_seconds:
+                self._completed.popleft()
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                self._condition.notify()
+
+    def on_throttle(self, started: float) -> None:
+        with self._condition:
+            self.throttles += 1
+            if started < self.last_decrease:
+                return
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+            self.last_decrease = time.monotonic()
+            logging.info(f"S3 throttled the requests, concurrency limit lowered to {int(self.limit)}")
+
+    @property
+    def request_rate(self) -> float:
+        """
+        Completed requests per second over the last rate_window_seconds
+        """
+        with self._condition:
+            now = time.monotonic()
+            while self._completed and self._completed[0] < now - self.rate_window_seconds:
+                self._completed.popleft()
+            return len(self._completed) / self.rate_window_seconds
+
+    def stats(self) -> dict:
+        request_rate = self.request_rate
+        with self._condition:
+            return {"limit": int(self.limit), "in_flight": self.in_flight, "requests": self.requests,
+                    "throttles": self.throttles, "request_rate": round(request_rate, 2)}
+
+    @staticmethod
+    def is_throttle(http_status: int, error_code: str) -> bool:
+        return http_status in THROTTLE_STATUS_CODES or error_code in THROTTLE_ERROR_CODES
+
+    def attach(self, s3_client) -> None:
+        """
+        Registers the limiter on the botocore events of s3_client
+        """
+        events = s3_client.meta.events
+        events.register("before-call.s3", self._before_call)
+        events.register("after-call.s3", self._after_call)
+        events.register("after-call-error.s3", self._after_call_error)
+        events.register("needs-retry.s3", self._needs_retry)
+
+    def _before_call(self, context, **kwargs):
+        context[self.CONTEXT_KEY] = self.acquire()
+
+    def _after_call(self, http_response, parsed, context, **kwargs):
+        started = context.pop(self.CONTEXT_KEY, None)
+        if started is None:
+            return
+        self.release()
+        # throttled responses were already counted by _needs_retry, which sees every attempt
+        if http_response.status_code < 500 and not self.is_throttle(http_response.status_code, parsed.get("Error", {}).get("Code", "")):
+            self.on_success()
+
+    def _after_call_error(self, context, **kwargs):
+        if context.pop(self.CONTEXT_KEY, None) is not None:
+            self.release()
+
+    def _needs_retry(self, response=None, request_dict=None, **kwargs):
+        # attempts retried inside botocore never reach after-call, so throttling is seen here
+        if response is None or request_dict is None:
+            return None
+        http_response, parsed = response
+        started = request_dict.get("context", {}).get(self.CONTEXT_KEY)
+        if started is not None and self.is_throttle(http_response.status_code, parsed.get("Error", {}).get("Code", "")):
+            self.on_throttle(started)
+        return None
@@ -0,0 +1,228 @@
+import binascii
+import hashlib
+import io
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Iterator, Optional
+
+from boto3.s3.transfer import TransferConfig
+
+from nyc_taxi_trips.constants import S3_MAX_SINGLE_COPY_SIZE
+from nyc_taxi_trips.entity.config_entity import S3TransferConfig
+from nyc_taxi_trips.exception import NycException
+
+
+class TransferEngine:
+    """
+    Moves bytes between S3 and the local process with a configurable part size and concurrency.
+    Whole-object transfers use the boto3 managed transfer with a matching TransferConfig, and
+    ranged GETs run on a shared, bounded thread pool so they can feed streaming consumers.
+    """
+
+    def __init__(self, s3_client, transfer_config: S3TransferConfig = S3TransferConfig()):
+        self.s3_client = s3_client
+        self.transfer_config = transfer_config
+        self.boto_transfer_config = TransferConfig(
+            multipart_threshold=transfer_config.multipart_threshold,
+            multipart_chunksize=transfer_config.part_size,
+            max_concurrency=transfer_config.max_concurrency,
+            use_threads=transfer_config.max_concurrency > 1,
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.transfer_config.max_concurrency,
+                                                    thread_name_prefix="s3-transfer")
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def upload_file(self, from_filename: str, bucket_name: str, key: str) -> None:
+        self.s3_client.upload_file(from_filename, bucket_name, key, Config=self.boto_transfer_config)
+
+    def download_file(self, bucket_name: str, key: str, to_filename: str) -> None:
+        self.s3_client.download_file(bucket_name, key, to_filename, Config=self.boto_transfer_config)
+
+    def upload_fileobj(self, fileobj, bucket_name: str, key: str) -> None:
+        self.s3_client.upload_fileobj(fileobj, bucket_name, key, Config=self.boto_transfer_config)
+
+    def download_fileobj(self, bucket_name: str, key: str, fileobj) -> None:
+        self.s3_client.download_fileobj(bucket_name, key, fileobj, Config=self.boto_transfer_config)
+
+    def copy_object(self, source_bucket_name: str, source_key: str, bucket_name: str, key: str) -> str:
+        """
+        Copies the object inside S3, without its bytes passing through the client. Objects uploaded
+        in a single part are copied with CopyObject, which must keep the source ETag. Multipart
+        objects, and single part objects too large for CopyObject, are copied with concurrent
+        UploadPartCopy calls, each conditional on the source ETag; the copy must then have the
+        source size and the multipart ETag computed from its parts (the source ETag itself when
+        the parts are aligned to the source parts). Returns the ETag of the copy.
+        """
+        try:
+            source = self.s3_client.head_object(Bucket=source_bucket_name, Key=source_key)
+            source_etag = source["ETag"]
+            copy_source = {"Bucket": source_bucket_name, "Key": source_key}
+            if "-" not in source_etag and source["ContentLength"] <= S3_MAX_SINGLE_COPY_SIZE:
+                response = self.s3_client.copy_object(CopySource=copy_source, CopySourceIfMatch=source_etag,
+                                                      Bucket=bucket_name, Key=key)
+                etag, expected_etag = response["CopyObjectResult"]["ETag"], source_etag
+            else:
+                etag, expected_etag = self._multipart_copy(copy_source, source, bucket_name, key)
+                copy_size = self.s3_client.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+                if copy_size != source["ContentLength"]:
+                    raise Exception(f"Copy of s3://{source_bucket_name}/{source_key} to s3://{bucket_name}/{key} "
+                                    f"has {copy_size} bytes, expected {source['ContentLength']}")
+            if etag != expected_etag:
+                raise Exception(f"Copy of s3://{source_bucket_name}/{source_key} to s3://{bucket_name}/{key} "
+                                f"has ETag {etag}, expected {expected_etag}")
+            return etag
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    @staticmethod
+    def multipart_etag(part_etags: list) -> str:
+        """
+        The ETag S3 gives a multipart object: the MD5 of its part MD5s, followed by the part count
+        """
+        digests = b"".join(binascii.unhexlify(part_etag.strip('"')) for part_etag in part_etags)
+        return f'"{hashlib.md5(digests).hexdigest()}-{len(part_etags)}"'
+
+    def _multipart_copy(self, copy_source: dict, source: dict, bucket_name: str, key: str) -> tuple:
+        """
+        Returns the ETag of the copy and the ETag it must have
+        """
+        size = source["ContentLength"]
+        if "-" in source["ETag"]:
+            part_size = self.s3_client.head_object(Bucket=copy_source["Bucket"], Key=copy_source["Key"],
+                                                   PartNumber=1)["ContentLength"]
+        else:
+            part_size = self.transfer_config.part_size
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=bucket_name, Key=key, ContentType=source.get("ContentType", "binary/octet-stream"),
+            Metadata=source.get("Metadata", {}))["UploadId"]
+
+        def copy_part(part_number: int, start: int) -> dict:
+            response = self.s3_client.upload_part_copy(
+                Bucket=bucket_name, Key=key, UploadId=upload_id, PartNumber=part_number,
+                CopySource=copy_source, CopySourceIfMatch=source["ETag"],
+                CopySourceRange=f"bytes={start}-{min(start + part_size, size) - 1}")
+            return {"PartNumber": part_number, "ETag": response["CopyPartResult"]["ETag"]}
+
+        try:
+            futures = [self.executor.submit(copy_part, part_number, start)
+                       for part_number, start in enumerate(range(0, size, part_size), start=1)]
+            parts = [future.result() for future in futures]
+            response = self.s3_client.complete_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                                                 MultipartUpload={"Parts": parts})
+            # a multipart source copied along its own parts keeps its ETag
+            expected_etag = source["ETag"] if "-" in source["ETag"] else self.multipart_etag([part["ETag"] for part in parts])
+            return response["ETag"], expected_etag
+        except Exception:
+            self.s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+            raise
+
+    def get_range(self, bucket_name: str, key: str, start: int, end: int) -> bytes:
+        """
+        Returns the bytes in [start, end) of the object with a single ranged GET
+        """
+        if start >= end:
+            return b""
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=key, Range=f"bytes={start}-{end - 1}")
+        return response["Body"].read()
+
+    def read_range(self, bucket_name: str, key: str, start: int, end: int) -> bytes:
+        """
+        Returns the bytes in [start, end) of the object. Ranges larger than one part are split into
+        parts that are fetched concurrently.
+        """
+        part_size = self.transfer_config.part_size
+        if end - start <= part_size:
+            return self.get_range(bucket_name, key, start, end)
+        return b"".join(self.iter_ranges(bucket_name, key, start=start, end=end))
+
+    def iter_ranges(self, bucket_name: str, key: str, start: int = 0, end: Optional[int] = None,
+                    part_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yields the object in consecutive parts, in order. Up to max_concurrency ranged GETs are in
+        flight ahead of the consumer, so memory stays bounded by max_concurrency * part_size. When
+        the consumer stops early, the GETs not started yet are cancelled and the running ones are
+        waited for, so no part outlives the iterator.
+        """
+        in_flight = deque()
+        try:
+            if end is None:
+                end = self.s3_client.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+            part_size = part_size or self.transfer_config.part_size
+            offsets = iter(range(start, end, part_size))
+
+            def submit_next() -> bool:
+                offset = next(offsets, None)
+                if offset is None:
+                    return False
+                in_flight.append(self.executor.submit(self.get_range, bucket_name, key, offset, min(offset + part_size, end)))
+                return True
+
+            while len(in_flight) < self.transfer_config.max_concurrency and submit_next():
+                pass
+            while in_flight:
+                data = in_flight.popleft().result()
+                submit_next()
+                yield data
+        except Exception as e:
+            raise NycException(e, sys) from e
+        finally:
+            for future in in_flight:
+                future.cancel()
+            wait(in_flight)
+            in_flight.clear()
+
+    def open_stream(self, bucket_name: str, key: str) -> "RangeStream":
+        """
+        Returns a read-only stream over the object that is filled by concurrent ranged GETs
+        """
+        return RangeStream(self.iter_ranges(bucket_name, key))
+
+
+class RangeStream(io.RawIOBase):
+    """
+    Non-seekable file object over an iterator of byte parts, e.g. TransferEngine.iter_ranges.
+    It lets consumers that expect a file, such as pandas.read_csv, read a parallel download
+    as it arrives.
+    """
+
+    def __init__(self, parts: Iterator[bytes]):
+        super().__init__()
+        self.parts = parts
+        self.current = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.current:
+            part = next(self.parts, None)
+            if part is None:
+                return 0
+            self.current = memoryview(part)
+        size = min(len(buffer), len(self.current))
+        buffer[:size] = self.current[:size]
+        self.current = self.current[size:]
+        return size
+
+    def close(self) -> None:
+        # closing iter_ranges cancels and drains its ranged GETs
+        close_parts = getattr(self.parts, "close", None)
+        if close_parts is not None:
+            close_parts()
+        self.current = memoryview(b"")
+        super().close()
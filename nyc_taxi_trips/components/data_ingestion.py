@@ -1,111 +1,526 @@
-
 import os
 import sys
+import hashlib
+import multiprocessing
+import posixpath
+import uuid
+import numpy as np
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from datetime import datetime, timezone
 from pandas import DataFrame
-from sklearn.model_selection import train_test_split
+from typing import Dict, Iterable, Iterator, List, Optional
 
+from nyc_taxi_trips.constants import SCHEMA_FILE_PATH, DATA_INGESTION_LEDGER_VERSION, DATA_INGESTION_ROW_MEMORY_BYTES, \
+    DATA_INGESTION_DIR_NAME
 from nyc_taxi_trips.entity.config_entity import DataIngestionConfig
 from nyc_taxi_trips.entity.artifact_entity import DataIngestionArtifact
 from nyc_taxi_trips.exception import NycException
 from nyc_taxi_trips.logger import logging
+from nyc_taxi_trips.utils.main_utils import read_yaml_file, hash_split_mask, get_dtype_plan, apply_dtype_plan, memory_savings_report, \
+    row_hashes, stratum_ids
 from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+from nyc_taxi_trips.cloud_actions.parquet_dataset import PartitionedDatasetWriter, new_manifest
+from nyc_taxi_trips.cloud_actions.arrow_source_cache import ArrowSourceCache
 
 
 
 
 class DataIngestion:
-    def __init__(self, filename: str, data_ingestion_config:DataIngestionConfig=DataIngestionConfig(),):
+    def __init__(self, source_files: List[dict], data_ingestion_config:DataIngestionConfig=DataIngestionConfig(),):
         """
+        :param source_files: source csv files as listed by SimpleStorageService.list_source_manifest,
+                             dicts with at least key and etag
         :param data_ingestion_config: configuration for data ingestion
         """
         try:
             self.data_ingestion_config = data_ingestion_config
-            self.filename = filename
+            self.source_files = source_files
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self.dtype_plan = get_dtype_plan(self._schema_config)
+            self.memory_plan = self.get_memory_plan()
+            self.nyc_taxi_data = SimpleStorageService(spool_max_size=self.memory_plan["spool_max_size"])
+            self.source_cache = None
+            if data_ingestion_config.source_cache_enabled:
+                self.source_cache = ArrowSourceCache(data_ingestion_config.source_cache_dir,
+                                                     parse_plan={"dtype_plan": self.dtype_plan,
+                                                                 "columns": self._schema_config["columns"]})
         except Exception as e:
             raise NycException(e,sys)
-        
 
-    
-    def export_data_into_feature_store(self)->DataFrame:
+
+    def get_memory_plan(self) -> dict:
+        """
+        Method Name :   get_memory_plan
+        Description :   This method fits the ingestion of one source file into worker_memory_bytes: half
+                        of it for a parsed chunk with its train and test copies, the other half for the
+                        in-memory part of the open partition file buffers, which spill to disk beyond it
+
+        Output      :   dictionary with chunk_size rows and spool_max_size bytes
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            half_budget = config.worker_memory_bytes // 2
+            chunk_size = max(1_000, min(config.chunk_size, half_budget // (2 * DATA_INGESTION_ROW_MEMORY_BYTES)))
+            spool_max_size = max(1024 * 1024, half_budget // config.max_open_partition_files)
+            return {"chunk_size": chunk_size, "spool_max_size": spool_max_size}
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def get_source_dtypes(self) -> dict:
+        """
+        Method Name :   get_source_dtypes
+        Description :   This method maps the schema column types to the pandas dtypes the source
+                        columns take without the compact dtype plan, the baseline of the memory report
+
+        Output      :   dictionary of column name to pandas dtype
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            dtype_map = {"float": "float64", "category": "object"}
+            return {name: dtype_map[kind] for column in self._schema_config["columns"] for name, kind in column.items()}
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def load_ledger(self) -> dict:
+        """
+        Method Name :   load_ledger
+        Description :   This method reads the ingestion ledger, which records the etag, row count and
+                        dataset files of every ingested source file
+
+        Output      :   ledger dictionary, empty when nothing was ingested yet
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            if self.nyc_taxi_data.head_object(config.artifact_bucket_name, config.ledger_key) is None:
+                return {"version": DATA_INGESTION_LEDGER_VERSION, "sources": {}}
+            ledger = self.nyc_taxi_data.load_json(config.artifact_bucket_name, config.ledger_key)
+            if ledger.get("version") != DATA_INGESTION_LEDGER_VERSION:
+                raise Exception(f"Unsupported ingestion ledger version {ledger.get('version')}")
+            return ledger
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def needs_full_ingestion(self, ledger: dict) -> bool:
+        """
+        True when every source file has to be ingested again: outside incremental mode, or when the
+        ledger was written with another split hash key, so that all rows use the same split
+        """
+        config = self.data_ingestion_config
+        if not config.incremental:
+            return True
+        if ledger["sources"] and ledger.get("split_hash_key") != config.split_hash_key:
+            logging.info("The ledger was written with another split hash key, re-ingesting every source file")
+            return True
+        return False
+
+
+    def plan_sources(self, ledger: dict) -> tuple:
+        """
+        Method Name :   plan_sources
+        Description :   This method compares the source files with the ledger. In incremental mode only
+                        new files and files whose etag changed are ingested, and ledger entries of
+                        files that are gone are removed; otherwise, or when the split hash key changed,
+                        every file is ingested again
+
+        Output      :   tuple of (source files to ingest, keys of ledger sources to remove)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            ingested = ledger["sources"]
+            source_keys = {source["key"] for source in self.source_files}
+            if self.needs_full_ingestion(ledger):
+                return list(self.source_files), [key for key in ingested if key not in source_keys]
+            pending = [source for source in self.source_files
+                       if source["key"] not in ingested or ingested[source["key"]]["etag"] != source["etag"]]
+            removed = [key for key in ingested if key not in source_keys]
+            logging.info(f"{len(pending)} new or changed source files, {len(self.source_files) - len(pending)} unchanged, "
+                         f"{len(removed)} removed")
+            return pending, removed
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def export_data_into_feature_store(self, source_key: str, etag: Optional[str] = None)->Iterator[DataFrame]:
         """
         Method Name :   export_data_into_feature_store
-        Description :   This method exports data from mongodb to csv file
-        
-        Output      :   data is returned as artifact of data ingestion components
+        Description :   This method streams the source csv file from s3 bucket in bounded chunks, parsed
+                        with the compact dtypes of the schema storage_dtypes. With the source cache, a
+                        source whose etag was parsed before is memory mapped from its Arrow IPC copy
+                        instead, and a parsed source is copied there on the way through
+
+        Output      :   iterator of dataframe chunks of the source file
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            logging.info(f"Exporting data from s3 bucket")
-            nyc_taxi_data = SimpleStorageService()
-            dataframe = nyc_taxi_data.read_csv(filename= self.filename, bucket_name= self.data_ingestion_config.data_bucket_name)
-            logging.info(f"Shape of dataframe: {dataframe.shape}")
-            logging.info(f"Dataframe Created from the exported data")
-            
-            
-            return dataframe
+            config = self.data_ingestion_config
+            chunk_size = self.memory_plan["chunk_size"]
+            if self.source_cache is not None and etag:
+                cached_path = self.source_cache.get(config.data_bucket_name, source_key, etag)
+                if cached_path is not None:
+                    logging.info(f"Reading {source_key} from its Arrow IPC copy {cached_path} in chunks of {chunk_size} rows")
+                    return (apply_dtype_plan(chunk, self.dtype_plan) for chunk in ArrowSourceCache.iter_chunks(cached_path, chunk_size))
+            logging.info(f"Exporting {source_key} from s3 bucket in chunks of {chunk_size} rows")
+            chunks = self.nyc_taxi_data.read_csv_chunks(filename= source_key,
+                                                        bucket_name= config.data_bucket_name,
+                                                        chunksize= chunk_size,
+                                                        dtype= self.dtype_plan["dtypes"])
+            chunks = (apply_dtype_plan(chunk, self.dtype_plan) for chunk in chunks)
+            if self.source_cache is None or not etag:
+                return chunks
+            return self._cache_source_chunks(chunks, source_key, etag)
 
         except Exception as e:
             raise NycException(e,sys)
-        
 
-    def split_data_as_train_test(self,dataframe: DataFrame) ->None:
+
+    def _cache_source_chunks(self, chunks: Iterator[DataFrame], source_key: str, etag: str) -> Iterator[DataFrame]:
+        # the copy is only kept when every chunk went through
+        with self.source_cache.writer(self.data_ingestion_config.data_bucket_name, source_key, etag) as sink:
+            for chunk in chunks:
+                sink.write(chunk)
+                yield chunk
+
+
+    def split_data_as_train_test(self,dataframes: Iterable[DataFrame], writer: PartitionedDatasetWriter) ->None:
         """
         Method Name :   split_data_as_train_test
-        Description :   This method splits the dataframe into train set and test set based on split ratio 
-        
-        Output      :   Folder is created in s3 bucket
+        Description :   This method splits every dataframe chunk into train set and test set based on split ratio,
+                        assigning each row from a stable hash of its split key columns, and streams
+                        the sets into the year/month partitioned parquet dataset
+
+        Output      :   Partition files are written to s3 bucket
         On Failure  :   Write an exception log and then raise an exception
         """
         logging.info("Entered split_data_as_train_test method of Data_Ingestion class")
 
         try:
-            nyc_taxi_data = SimpleStorageService()
-            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio)
-            logging.info("Performed train test split on the dataframe")
+            config = self.data_ingestion_config
+            for chunk_number, dataframe in enumerate(dataframes):
+                if chunk_number == 0:
+                    self.log_memory_savings(dataframe)
+                test_mask = hash_split_mask(dataframe, self._schema_config["split_key_columns"],
+                                            config.train_test_split_ratio, config.split_hash_key)
+                writer.write(config.train_split, dataframe[~test_mask])
+                writer.write(config.test_split, dataframe[test_mask])
+            logging.info(f"Performed train test split on {writer.rows} rows")
             logging.info(
                 "Exited split_data_as_train_test method of Data_Ingestion class"
             )
-            
-            logging.info(f"Exporting train and test file path.")
-            nyc_taxi_data.write_parquet_to_s3(train_set, self.data_ingestion_config.artifact_bucket_name, self.data_ingestion_config.training_file_key)
-            nyc_taxi_data.write_parquet_to_s3(test_set, self.data_ingestion_config.artifact_bucket_name, self.data_ingestion_config.testing_file_key)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def log_memory_savings(self, dataframe: DataFrame) -> dict:
+        """
+        Method Name :   log_memory_savings
+        Description :   This method logs the memory every column of a chunk takes with the compact dtype
+                        plan against its baseline dtype
+
+        Output      :   memory savings report of the chunk
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            report = memory_savings_report(dataframe, self.get_source_dtypes())
+            for column, column_report in report.items():
+                logging.info(f"{column}: {column_report['dtype']} takes {column_report['bytes_per_row']} bytes per row "
+                             f"instead of {column_report['baseline_bytes_per_row']}, {column_report['saved_percent']}% saved")
+            baseline = sum(column_report["baseline_bytes_per_row"] for column_report in report.values())
+            compact = sum(column_report["bytes_per_row"] for column_report in report.values())
+            logging.info(f"Rows take {compact:.1f} bytes instead of {baseline:.1f}, {100 * (1 - compact / baseline):.1f}% saved")
+            return report
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def ingest_source(self, source_key: str, etag: Optional[str] = None, run_id: str = "") -> List[dict]:
+        """
+        Method Name :   ingest_source
+        Description :   This method streams one source csv file into the partitioned dataset. Its files
+                        are named after a hash of the source key and the ingestion run, so they never
+                        overwrite files of other sources or files the current manifest refers to
+
+        Output      :   manifest entries of the written files
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            writer_id = hashlib.sha1(source_key.encode()).hexdigest()[:8]
+            if run_id:
+                writer_id = f"{writer_id}-{run_id}"
+            with self.nyc_taxi_data.open_dataset_writer(config.artifact_bucket_name, config.dataset_root_key, writer_id,
+                                                        partition_column=self._schema_config["partition_column"],
+                                                        encoding=config.parquet_encoding,
+                                                        max_open_files=config.max_open_partition_files,
+                                                        max_rows_per_file=config.max_rows_per_file) as writer:
+                self.split_data_as_train_test(self.export_data_into_feature_store(source_key, etag), writer)
+            if not writer.files:
+                raise Exception(f"No rows were ingested from {source_key}")
+            for entry in writer.files:
+                entry["source_key"] = source_key
+            return writer.files
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+    def ingest_sources(self, source_files: List[dict], run_id: str) -> Dict[str, List[dict]]:
+        """
+        Method Name :   ingest_sources
+        Description :   This method ingests the source files in parallel on a pool of max_workers
+                        processes, each within worker_memory_bytes, so csv parsing scales with cores.
+                        Every worker writes its own partition files; a single file is ingested in process.
+                        When any source fails, every file written in run_id is deleted again
+
+        Output      :   dictionary of source key to the manifest entries of its files
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            workers = min(self.data_ingestion_config.max_workers, len(source_files))
+            if workers <= 1:
+                return {source["key"]: self.ingest_source(source["key"], source.get("etag"), run_id) for source in source_files}
+            logging.info(f"Ingesting {len(source_files)} source files on {workers} worker processes")
+            results = {}
+            # boto3 clients and the limiter threads must not be forked, so workers are spawned
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {executor.submit(ingest_source_in_worker, source["key"], source.get("etag"), run_id,
+                                           self.data_ingestion_config): source["key"]
+                           for source in source_files}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception:
+                        # sources not started yet are dropped, running ones finish before the run is discarded
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    logging.info(f"Ingested {futures[future]} into {len(results[futures[future]])} partition files")
+            return results
+        except Exception as e:
+            self.discard_run_files(run_id)
+            raise NycException(e, sys) from e
+
+
+    def discard_run_files(self, run_id: str) -> None:
+        """
+        Method Name :   discard_run_files
+        Description :   This method deletes the partition files an ingestion run wrote below the dataset
+                        root, found by the run id in their names. They are not in the manifest or the
+                        ledger yet, so nothing else would ever remove them
+
+        Output      :   Files of the run are deleted from s3 bucket
+        On Failure  :   Write an exception log, the files are left behind
+        """
+        try:
+            config = self.data_ingestion_config
+            keys = [key for key in self.nyc_taxi_data.list_keys(config.artifact_bucket_name, f"{config.dataset_root_key}/")
+                    if f"-{run_id}-" in posixpath.basename(key)]
+            if keys:
+                self.nyc_taxi_data.delete_objects(config.artifact_bucket_name, keys)
+            logging.info(f"Discarded {len(keys)} partition files of the failed ingestion run {run_id}")
+        except Exception as e:
+            logging.info(f"Could not discard the partition files of the failed ingestion run {run_id}: {e}")
+
+
+
+    def sample_sources(self, source_files: List[dict]) -> DataFrame:
+        """
+        Method Name :   sample_sources
+        Description :   This method streams the source files and draws a reproducible stratified sample
+                        by the schema sample_strata. Every row gets a uniform value from a hash salted
+                        with sample_hash_key, independent of the train/test split hash; rows below a threshold are kept as candidates while the rows of every stratum
+                        are counted, and each stratum finally keeps its share of the rows with the
+                        smallest values, so strata are represented in proportion to the full data
+
+        Output      :   dataframe of the sampled rows
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            strata = self._schema_config["sample_strata"]
+            key_columns = self._schema_config["split_key_columns"]
+            oversampling = 1 + config.sample_oversampling
+            threshold = min(1.0, config.sample_fraction * oversampling) if config.sample_fraction is not None else 1.0
+            max_candidates = None if config.sample_rows is None else int(config.sample_rows * oversampling) + 1
+            if config.sample_hash_key == config.split_hash_key:
+                # the rows with the smallest values would then all fall on the test side of the split
+                raise Exception("sample_hash_key must differ from split_hash_key")
+            candidates = None
+            counts = pd.Series(dtype="int64")
+            for source in source_files:
+                for chunk in self.export_data_into_feature_store(source["key"], source.get("etag")):
+                    chunk = chunk.assign(_sample_value=row_hashes(chunk, key_columns, config.sample_hash_key) / np.float64(2 ** 64),
+                                         _stratum=stratum_ids(chunk, strata))
+                    counts = counts.add(chunk["_stratum"].value_counts(), fill_value=0)
+                    kept = chunk[chunk["_sample_value"] < threshold]
+                    candidates = kept if candidates is None else pd.concat([candidates, kept], ignore_index=True)
+                    if max_candidates is not None and len(candidates) > max_candidates:
+                        # the candidates stay the rows with the smallest values seen so far
+                        candidates = candidates.nsmallest(max_candidates, "_sample_value")
+                        threshold = candidates["_sample_value"].max()
+            if candidates is None:
+                raise Exception("No source rows to sample from")
 
-            logging.info(f"Exported train and test file path.")
+            population = int(counts.sum())
+            fraction = config.sample_fraction if config.sample_fraction is not None else min(1.0, config.sample_rows / population)
+            quotas = (counts * fraction).round().astype("int64")
+            candidates = candidates.sort_values("_sample_value", kind="stable")
+            rank = candidates.groupby("_stratum", sort=False).cumcount()
+            sample = candidates[rank.to_numpy() < quotas.reindex(candidates["_stratum"]).to_numpy()]
+            shortfall = int(quotas.sum()) - len(sample)
+            logging.info(f"Sampled {len(sample)} of {population} rows ({fraction:.4%}) in {len(quotas)} strata, "
+                         f"{shortfall} rows short of the stratum quotas")
+            self.sample_info = {"fraction": fraction, "population_rows": population, "rows": len(sample),
+                                "strata": strata, "shortfall": shortfall}
+            return sample.drop(columns=["_sample_value", "_stratum"]).reset_index(drop=True)
         except Exception as e:
             raise NycException(e, sys) from e
-        
 
 
-    
+    def initiate_sample_ingestion(self) -> DataIngestionArtifact:
+        """
+        Method Name :   initiate_sample_ingestion
+        Description :   This method ingests a stratified sample of all source files into its own dataset,
+                        split into train and test set like the full dataset, replacing the previous sample
+
+        Output      :   sample dataset manifest and splits are returned as the artifacts of data ingestion components
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered initiate_sample_ingestion method of Data_Ingestion class")
+
+        try:
+            config = self.data_ingestion_config
+            if config.dataset_root_key.startswith(f"{DATA_INGESTION_DIR_NAME}/"):
+                raise Exception("A sample must be ingested below its own namespace, use DataIngestionConfig.sample")
+            previous_manifest = self.nyc_taxi_data.load_dataset_manifest(config.artifact_bucket_name, config.manifest_key)
+            sample = self.sample_sources(self.source_files)
+
+            with self.nyc_taxi_data.open_dataset_writer(config.artifact_bucket_name, config.dataset_root_key, "sample",
+                                                        partition_column=self._schema_config["partition_column"],
+                                                        encoding=config.parquet_encoding,
+                                                        max_open_files=config.max_open_partition_files,
+                                                        max_rows_per_file=config.max_rows_per_file) as writer:
+                self.split_data_as_train_test([sample], writer)
+            manifest = new_manifest(self._schema_config["partition_column"], writer.files)
+            manifest["sample"] = self.sample_info
+            self.nyc_taxi_data.save_dataset_manifest(manifest, config.artifact_bucket_name, config.manifest_key)
+            if previous_manifest is not None:
+                current_keys = {entry["key"] for entry in writer.files}
+                stale_keys = [entry["key"] for entry in previous_manifest["files"] if entry["key"] not in current_keys]
+                if stale_keys:
+                    self.nyc_taxi_data.delete_objects(config.artifact_bucket_name, stale_keys)
+
+            data_ingestion_artifact = DataIngestionArtifact(manifest_key=config.manifest_key,
+            train_split=config.train_split, test_split=config.test_split,
+            artifact_bucket= config.artifact_bucket_name,
+            ingested_sources=[source["key"] for source in self.source_files])
+            logging.info(f"Data ingestion artifact: {data_ingestion_artifact}")
+            logging.info("Exited initiate_sample_ingestion method of Data_Ingestion class")
+            return data_ingestion_artifact
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+
     def initiate_data_ingestion(self) ->DataIngestionArtifact:
         """
         Method Name :   initiate_data_ingestion
-        Description :   This method initiates the data ingestion components of training pipeline 
-        
-        Output      :   train set and test set are returned as the artifacts of data ingestion components
+        Description :   This method initiates the data ingestion components of training pipeline. The
+                        partitions of new and changed source files replace theirs in the dataset and the
+                        manifest, the files of unchanged sources are kept, and the ledger is updated
+
+        Output      :   dataset manifest and splits are returned as the artifacts of data ingestion components
         On Failure  :   Write an exception log and then raise an exception
         """
         logging.info("Entered initiate_data_ingestion method of Data_Ingestion class")
 
         try:
-            dataframe = self.export_data_into_feature_store()
-
-            logging.info("Got the data from s3 bucket")
+            config = self.data_ingestion_config
+            if config.is_sample:
+                return self.initiate_sample_ingestion()
+            ledger = self.load_ledger()
+            manifest = self.nyc_taxi_data.load_dataset_manifest(config.artifact_bucket_name, config.manifest_key)
+            if manifest is None:
+                manifest = new_manifest(self._schema_config["partition_column"])
+            full_ingestion = self.needs_full_ingestion(ledger)
+            pending, removed = self.plan_sources(ledger)
 
-            self.split_data_as_train_test(dataframe)
+            replaced = set(removed) | {source["key"] for source in pending}
+            if full_ingestion:
+                replaced |= {entry.get("source_key") for entry in manifest["files"]}
+            kept_files = [entry for entry in manifest["files"] if entry.get("source_key") not in replaced]
+            new_files = []
+            logging.info("Streaming the data from s3 bucket")
+            run_id = uuid.uuid4().hex[:8]
+            ingested = self.ingest_sources(pending, run_id)
+            for source in pending:
+                files = ingested[source["key"]]
+                new_files.extend(files)
+                ledger["sources"][source["key"]] = {"etag": source["etag"], "size": source.get("size"),
+                                                    "rows": sum(entry["rows"] for entry in files),
+                                                    "files": [entry["key"] for entry in files],
+                                                    "ingested_at": datetime.now(timezone.utc).isoformat()}
+            for key in removed:
+                ledger["sources"].pop(key, None)
+            ledger["split_hash_key"] = config.split_hash_key
 
-            logging.info("Performed train test split on the dataset")
+            if pending or removed or full_ingestion:
+                # the dataset changed, it counts as trained once a training run on it finished
+                ledger["trained"] = False
+                previous_keys = {entry["key"] for entry in manifest["files"]}
+                manifest["files"] = kept_files + new_files
+                self.nyc_taxi_data.save_dataset_manifest(manifest, config.artifact_bucket_name, config.manifest_key)
+                self.nyc_taxi_data.save_json(ledger, config.artifact_bucket_name, config.ledger_key)
+                # files are only deleted once no manifest refers to them any more
+                current_keys = {entry["key"] for entry in manifest["files"]}
+                stale_keys = sorted(previous_keys - current_keys)
+                if stale_keys:
+                    self.nyc_taxi_data.delete_objects(config.artifact_bucket_name, stale_keys)
 
             logging.info(
                 "Exited initiate_data_ingestion method of Data_Ingestion class"
             )
 
-            data_ingestion_artifact = DataIngestionArtifact(trained_file_key=self.data_ingestion_config.training_file_key,
-            test_file_key=self.data_ingestion_config.testing_file_key, artifact_bucket= self.data_ingestion_config.artifact_bucket_name)
-            
+            data_ingestion_artifact = DataIngestionArtifact(manifest_key=config.manifest_key,
+            train_split=config.train_split, test_split=config.test_split,
+            artifact_bucket= config.artifact_bucket_name,
+            ingested_sources=[source["key"] for source in pending], removed_sources=removed,
+            trained=ledger.get("trained", False))
+
             logging.info(f"Data ingestion artifact: {data_ingestion_artifact}")
             return data_ingestion_artifact
         except Exception as e:
             raise NycException(e, sys) from e
+
+
+    def mark_trained(self) -> None:
+        """
+        Method Name :   mark_trained
+        Description :   This method records in the ledger that a training run on the current dataset
+                        finished, so incremental runs without new or changed source files skip
+                        retraining. Until then every run retrains, also after a failed one
+
+        Output      :   ledger is updated in s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            ledger = self.load_ledger()
+            ledger["trained"] = True
+            self.nyc_taxi_data.save_json(ledger, config.artifact_bucket_name, config.ledger_key)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+
+
+def ingest_source_in_worker(source_key: str, etag: Optional[str], run_id: str, data_ingestion_config: DataIngestionConfig) -> List[dict]:
+    """
+    Entry point of the ingestion worker processes
+    """
+    return DataIngestion(source_files=[], data_ingestion_config=data_ingestion_config).ingest_source(source_key, etag, run_id)
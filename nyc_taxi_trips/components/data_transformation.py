@@ -12,8 +12,8 @@ from nyc_taxi_trips.entity.config_entity import DataTransformationConfig
 from nyc_taxi_trips.entity.artifact_entity import DataTransformationArtifact, DataIngestionArtifact, DataValidationArtifact
 from nyc_taxi_trips.exception import NycException
 from nyc_taxi_trips.logger import logging
-from nyc_taxi_trips.utils.main_utils import read_yaml_file, drop_columns, remove_outliers_iqr
-from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+from nyc_taxi_trips.utils.main_utils import read_yaml_file, drop_columns, remove_outliers_iqr, get_required_columns, get_row_filters
+from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService, TransferRequest
 
 
 
@@ -94,18 +94,16 @@ class DataTransformation:
                 preprocessor = self.get_data_transformer_object()
                 logging.info("Got the preprocessor object")
 
+                read_columns = get_required_columns(self._schema_config)
+                row_filters = get_row_filters(self._schema_config)
+
                 nyc_artifact = SimpleStorageService()
-                train_df = nyc_artifact.read_parquet_from_s3(source_bucket_name= self.data_ingestion_artifact.artifact_bucket, source_file_key= self.data_ingestion_artifact.trained_file_key)
-                test_df = nyc_artifact.read_parquet_from_s3(source_bucket_name= self.data_ingestion_artifact.artifact_bucket, source_file_key= self.data_ingestion_artifact.test_file_key)
+                dataset = nyc_artifact.load_dataset(bucket_name= self.data_ingestion_artifact.artifact_bucket, manifest_key= self.data_ingestion_artifact.manifest_key)
+                train_df = dataset.read(self.data_ingestion_artifact.train_split, columns= read_columns, filters= row_filters)
+                test_df = dataset.read(self.data_ingestion_artifact.test_split, columns= read_columns, filters= row_filters)
 
                 logging.info("Got train features and test features of Training dataset")
-
-                train_df = train_df[train_df['passenger_count'] > 0]
-                train_df = train_df[train_df['trip_distance'] > 0]
-                train_df = train_df[train_df['fare_amount'] > 0]
-                train_df = train_df[train_df['total_amount'] > 0]
-
-                logging.info("Filtered only non zero values into the training set")
+                logging.info("Filtered only non zero values into the training set and the test set")
 
                 train_df['tpep_pickup_datetime'] = train_df['tpep_pickup_datetime'].astype('datetime64[ns]')
                 train_df['tpep_dropoff_datetime'] = train_df['tpep_dropoff_datetime'].astype('datetime64[ns]')
@@ -117,7 +115,7 @@ class DataTransformation:
                 train_df['pickup_month'] = train_df['tpep_pickup_datetime'].dt.month
                 train_df = train_df[train_df['duration'] > 0]
 
-                drop_cols = self._schema_config['drop_columns']
+                drop_cols = [col for col in self._schema_config['drop_columns'] if col in train_df.columns]
                 num_features = self._schema_config['num_features']
 
                 
@@ -135,13 +133,6 @@ class DataTransformation:
                 
 
 
-                test_df = test_df[test_df['passenger_count'] > 0]
-                test_df = test_df[test_df['trip_distance'] > 0]
-                test_df = test_df[test_df['fare_amount'] > 0]
-                test_df = test_df[test_df['total_amount'] > 0]
-
-                logging.info("Filtered all non zero values into the Test dataset")
-
                 test_df['tpep_pickup_datetime'] = test_df['tpep_pickup_datetime'].astype('datetime64[ns]')
                 test_df['tpep_dropoff_datetime'] = test_df['tpep_dropoff_datetime'].astype('datetime64[ns]')
                 test_df['duration'] = test_df['tpep_dropoff_datetime'] - test_df['tpep_pickup_datetime']
@@ -183,19 +174,16 @@ class DataTransformation:
                 logging.info("Used the preprocessor object to transform the test features")
 
 
-                train_arr = np.c_[
-                    input_feature_train_arr, np.array(target_feature_train_df)
-                ]
-
-                test_arr = np.c_[
-                    input_feature_test_arr, np.array(target_feature_test_df)
-                ]
-
                 pre = SimpleStorageService()
 
-                pre.upload_object_to_folder(obj=preprocessor, bucket_name=self.data_ingestion_artifact.artifact_bucket, target_key=self.data_transformation_config.transformed_object_file_key)
-                pre.upload_array_to_folder(array=train_arr, bucket_name=self.data_ingestion_artifact.artifact_bucket, target_key=self.data_transformation_config.transformed_train_file_key)
-                pre.upload_array_to_folder(array=test_arr, bucket_name=self.data_ingestion_artifact.artifact_bucket, target_key=self.data_transformation_config.transformed_test_file_key)
+                shard_options = dict(shard_rows= self.data_transformation_config.shard_rows)
+                pre.put_many([
+                    TransferRequest("object", self.data_ingestion_artifact.artifact_bucket, self.data_transformation_config.transformed_object_file_key, obj=preprocessor),
+                    TransferRequest("shards", self.data_ingestion_artifact.artifact_bucket, self.data_transformation_config.transformed_train_file_key,
+                                    obj=(input_feature_train_arr, np.asarray(target_feature_train_df)), options= shard_options),
+                    TransferRequest("shards", self.data_ingestion_artifact.artifact_bucket, self.data_transformation_config.transformed_test_file_key,
+                                    obj=(input_feature_test_arr, np.asarray(target_feature_test_df)), options= shard_options),
+                ])
 
                 logging.info("Saved the preprocessor object")
 
@@ -1,20 +1,27 @@
 
+import hashlib
 import json
+import posixpath
+import os
 import sys
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
 
-import pandas as pd
-# from evidently.model_profile import Profile
-# from evidently.model_profile.sections import DataDriftProfileSection
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from pandas import DataFrame
 
 from nyc_taxi_trips.exception import NycException
 from nyc_taxi_trips.logger import logging
-from nyc_taxi_trips.utils.main_utils import read_yaml_file, write_yaml_file
+from nyc_taxi_trips.utils.main_utils import read_yaml_file, write_yaml_file, validation_statistics, merge_validation_statistics
+from nyc_taxi_trips.utils.sketches import DatasetSketch
 from nyc_taxi_trips.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from nyc_taxi_trips.entity.config_entity import DataValidationConfig
 from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
-from nyc_taxi_trips.constants import SCHEMA_FILE_PATH
+from nyc_taxi_trips.cloud_actions.parquet_dataset import DatasetReader
+from nyc_taxi_trips.constants import SCHEMA_FILE_PATH, DATA_VALIDATION_REFERENCE_SKETCH_FILE_NAME, DATA_VALIDATION_RESULT_CACHE_FILE_NAME
 
 
 class DataValidation:
@@ -76,89 +83,453 @@ class DataValidation:
         except Exception as e:
             raise NycException(e, sys) from e
 
-    # @staticmethod
-    # def read_data(file_path) -> DataFrame:
-    #     try:
-    #         nyc_artifact = SimpleStorageService()
-    #         return nyc_artifact.read_parquet_from_s3(source_bucket_name= self.data_ingestion_artifact.artifact_bucket, source_file_key= file_path)
-    #     except Exception as e:
-    #         raise NycException(e, sys)
-
-    # def detect_dataset_drift(self, reference_df: DataFrame, current_df: DataFrame, ) -> bool:
-    #     """
-    #     Method Name :   detect_dataset_drift
-    #     Description :   This method validates if drift is detected
-        
-    #     Output      :   Returns bool value based on validation results
-    #     On Failure  :   Write an exception log and then raise an exception
-    #     """
-    #     try:
-    #         data_drift_profile = Profile(sections=[DataDriftProfileSection()])
+    @staticmethod
+    def storage_type_matches(arrow_type: pa.DataType, storage_dtype: str) -> bool:
+        """
+        Whether a stored arrow type is the one the schema storage_dtypes entry is written as
+        """
+        if storage_dtype == "datetime":
+            return pa.types.is_timestamp(arrow_type)
+        if storage_dtype == "category":
+            return pa.types.is_dictionary(arrow_type) or pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+        return arrow_type == pa.from_numpy_dtype(np.dtype(storage_dtype))
+
+    @staticmethod
+    def footer_null_counts(metadata: pq.FileMetaData) -> Dict[str, int]:
+        """
+        Null count of every column of a file summed over its row groups from the footer statistics;
+        columns without statistics are left out
+        """
+        null_counts = {}
+        for row_group_number in range(metadata.num_row_groups):
+            row_group = metadata.row_group(row_group_number)
+            for column_number in range(row_group.num_columns):
+                column = row_group.column(column_number)
+                if column.statistics is not None and column.statistics.has_null_count:
+                    null_counts[column.path_in_schema] = null_counts.get(column.path_in_schema, 0) + column.statistics.null_count
+        return null_counts
+
+    def validate_metadata(self, dataset: DatasetReader, split: str, name: str) -> Tuple[str, List[Tuple[dict, pq.FileMetaData]]]:
+        """
+        Method Name :   validate_metadata
+        Description :   This method validates every file of a split from its parquet footer only: the columns
+                        and their stored types against the schema, the same schema across files and the row
+                        counts against the manifest, so its cost depends on the metadata size, not the data size
+
+        Output      :   Returns the validation error message, empty when valid, and the footers of the files
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            footers = dataset.metadata(split)
+            if not footers:
+                return f"No files in {name} dataframe.", footers
+            validation_error_msg = ""
+            schema = footers[0][1].schema.to_arrow_schema()
+            empty_df = schema.empty_table().to_pandas()
+            if not self.validate_number_of_columns(dataframe=empty_df):
+                validation_error_msg += f"Columns are missing in {name} dataframe."
+            if not self.is_column_exist(df=empty_df):
+                validation_error_msg += f"Columns are missing in {name} dataframe."
+
+            wrong_types = [f"{column}: {schema.field(column).type}" for column, storage_dtype in self._schema_config["storage_dtypes"].items()
+                           if column in schema.names and not self.storage_type_matches(schema.field(column).type, storage_dtype)]
+            if wrong_types:
+                validation_error_msg += f"Columns of {name} dataframe are stored with unexpected types {wrong_types}."
+
+            null_counts: Dict[str, int] = {}
+            for entry, metadata in footers:
+                if not metadata.schema.to_arrow_schema().equals(schema):
+                    validation_error_msg += f"Schema of {entry['key']} differs from the rest of {name} dataframe."
+                if metadata.num_rows != entry["rows"]:
+                    validation_error_msg += f"{entry['key']} holds {metadata.num_rows} rows, the manifest lists {entry['rows']}."
+                for column, null_count in self.footer_null_counts(metadata).items():
+                    null_counts[column] = null_counts.get(column, 0) + null_count
+
+            logging.info(f"Validated the footers of {len(footers)} {name} files with {sum(metadata.num_rows for _, metadata in footers)} rows "
+                         f"in {sum(metadata.num_row_groups for _, metadata in footers)} row groups, "
+                         f"null counts: {{{', '.join(f'{column}: {count}' for column, count in null_counts.items() if count)}}}")
+            return validation_error_msg, footers
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def inconclusive_range_columns(self, footers: List[Tuple[dict, pq.FileMetaData]]) -> List[str]:
+        """
+        Method Name :   inconclusive_range_columns
+        Description :   This method checks the range rules against the min/max footer statistics of every row
+                        group. A column is inconclusive when a row group has no statistics for it or values
+                        outside its range; only streaming the rows can then tell how many rows break the rule
+
+        Output      :   Returns the inconclusive columns of the range rules
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            ranges = self._schema_config["validation_rules"]["ranges"]
+            inconclusive = set()
+            for _, metadata in footers:
+                column_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+                for row_group_number in range(metadata.num_row_groups):
+                    row_group = metadata.row_group(row_group_number)
+                    for column, (low, high) in ranges.items():
+                        if column not in column_index or column in inconclusive:
+                            continue
+                        statistics = row_group.column(column_index[column]).statistics
+                        if statistics is None or not statistics.has_min_max \
+                                or (low is not None and statistics.min < low) or (high is not None and statistics.max > high):
+                            inconclusive.add(column)
+            return sorted(inconclusive)
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def content_check_plan(self, footers: List[Tuple[dict, pq.FileMetaData]], name: str) -> Optional[Tuple[dict, Optional[List[str]]]]:
+        """
+        The validation rules a split is streamed for and the columns streamed for them, None for every
+        column, or None when its row groups are not streamed. content_check True streams every column
+        for every rule and False never streams; otherwise the domain and order rules, which footer
+        statistics cannot prove, and the range rules the statistics leave inconclusive are checked
+        on just their columns
+        """
+        rules = self._schema_config["validation_rules"]
+        if self.data_validation_config.content_check is not None:
+            return (rules, None) if self.data_validation_config.content_check else None
+        inconclusive = self.inconclusive_range_columns(footers)
+        checked = {"ranges": {column: rules["ranges"][column] for column in inconclusive},
+                   "domains": rules.get("domains", {}), "order": rules.get("order", [])}
+        if not any(checked.values()):
+            logging.info(f"Footer statistics of {name} dataframe prove every range rule, skipped the content check")
+            return None
+        columns = sorted(set(checked["ranges"]) | set(checked["domains"]) | {column for pair in checked["order"] for column in pair})
+        logging.info(f"Streaming the columns {columns} of {name} dataframe for its domain and order rules and the range "
+                     f"rules its footer statistics leave inconclusive: {inconclusive}")
+        return checked, columns
+
+    def validate_content(self, dataset: DatasetReader, split: str, name: str,
+                         footers: List[Tuple[dict, pq.FileMetaData]], rules: Optional[dict] = None,
+                         columns: Optional[List[str]] = None) -> Tuple[str, dict]:
+        """
+        Method Name :   validate_content
+        Description :   This method streams columns of the split, every column by default, one row group at a
+                        time, checks that every row group decodes to the rows and null counts its footer
+                        statistics claim, and checks its rows against rules, by default the schema
+                        validation_rules, with vectorized masks. The statistics of the row groups are merged
+                        per month partition and for the whole split
+
+        Output      :   Returns the validation error message, empty when valid, and the merged statistics
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            validation_error_msg = ""
+            if rules is None:
+                rules = self._schema_config["validation_rules"]
+            metadata_by_key = {entry["key"]: metadata for entry, metadata in footers}
+            report = {"total": {}, "partitions": {}}
+            row_groups = 0
+            for entry, row_group_number, df in dataset.iter_row_groups(split, columns=columns):
+                row_groups += 1
+                row_group = metadata_by_key[entry["key"]].row_group(row_group_number)
+                if len(df) != row_group.num_rows:
+                    validation_error_msg += f"Row group {row_group_number} of {entry['key']} decodes to {len(df)} rows, its footer lists {row_group.num_rows}."
+                stats = validation_statistics(df, rules)
+                for column_number in range(row_group.num_columns):
+                    column = row_group.column(column_number)
+                    statistics = column.statistics
+                    if statistics is not None and statistics.has_null_count and column.path_in_schema in stats["columns"] \
+                            and stats["columns"][column.path_in_schema]["nulls"] != statistics.null_count:
+                        validation_error_msg += (f"Row group {row_group_number} of {entry['key']} has {stats['columns'][column.path_in_schema]['nulls']} "
+                                                 f"nulls in {column.path_in_schema}, its footer lists {statistics.null_count}.")
+                merge_validation_statistics(report["total"], stats)
+                partition = f"year={entry['partition']['year']:04d}/month={entry['partition']['month']:02d}"
+                merge_validation_statistics(report["partitions"].setdefault(partition, {}),
+                                            {"rows": stats["rows"], "violations": stats["violations"]})
+            logging.info(f"Streamed {row_groups} row groups of {name} dataframe for the content check")
+            validation_error_msg += self.check_rule_violations(report, name)
+            return validation_error_msg, report
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def check_rule_violations(self, report: dict, name: str) -> str:
+        """
+        Method Name :   check_rule_violations
+        Description :   This method fails a split when the violations of a validation rule exceed
+                        max_violation_ratio of its rows, over the whole split or in any one month
+
+        Output      :   Returns the validation error message, empty when valid
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            max_violation_ratio = self._schema_config["validation_rules"]["max_violation_ratio"]
+            validation_error_msg = ""
+            for scope, stats in [(f"{name} dataframe", report["total"])] + \
+                    [(f"{partition} of {name} dataframe", stats) for partition, stats in sorted(report["partitions"].items())]:
+                for rule, count in stats.get("violations", {}).items():
+                    if count:
+                        logging.info(f"{count} of {stats['rows']} rows of {scope} break {rule}")
+                    if stats["rows"] and count / stats["rows"] > max_violation_ratio:
+                        validation_error_msg += f"{count} of {stats['rows']} rows of {scope} break {rule}."
+            return validation_error_msg
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def new_sketch(self) -> DatasetSketch:
+        config = self.data_validation_config
+        return DatasetSketch(self._schema_config["drift_columns"]["quantiles"], self._schema_config["drift_columns"]["frequencies"],
+                             k=config.kll_k, width=config.count_min_width, depth=config.count_min_depth)
+
+    @staticmethod
+    def partition_label(entry: dict) -> str:
+        return f"year={entry['partition']['year']:04d}/month={entry['partition']['month']:02d}"
+
+    def sketch_files(self, dataset: DatasetReader, entries: List[dict]) -> Dict[str, DatasetSketch]:
+        """
+        Method Name :   sketch_files
+        Description :   This method streams the drift columns of the files one row group at a time into
+                        a sketch per month partition, so memory is bounded by the row group and sketch sizes
+
+        Output      :   Returns the sketch of every month partition of the files
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            sketches: Dict[str, DatasetSketch] = {}
+            columns = self.new_sketch().columns
+            for entry, _, df in dataset.iter_file_row_groups(entries, columns=columns):
+                label = self.partition_label(entry)
+                if label not in sketches:
+                    sketches[label] = self.new_sketch()
+                sketches[label].update(df)
+            return sketches
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def dataset_file_etags(self, nyc_artifact: SimpleStorageService) -> Dict[str, str]:
+        """
+        ETags of the parquet files below the dataset root, listed in one pass without the listing cache
+        """
+        root_prefix = posixpath.dirname(self.data_ingestion_artifact.manifest_key) + "/"
+        return {item["key"]: item["etag"] for item in nyc_artifact.list_source_manifest(
+            self.data_ingestion_artifact.artifact_bucket, prefix=root_prefix, suffix=".parquet", refresh=True)}
+
+    def load_reference_sketch(self, dataset: DatasetReader, entries: List[dict]) -> DatasetSketch:
+        """
+        Method Name :   load_reference_sketch
+        Description :   This method returns the sketch of the reference training files. It is persisted next
+                        to the dataset manifest with a fingerprint of the files' keys, rows and ETags, and only
+                        rebuilt when the training files differ from the ones it was built from, rewritten
+                        files under the same keys included
+
+        Output      :   Returns the reference sketch
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            nyc_artifact = dataset.storage
+            sketch_key = posixpath.join(posixpath.dirname(self.data_ingestion_artifact.manifest_key), DATA_VALIDATION_REFERENCE_SKETCH_FILE_NAME)
+            etags = self.dataset_file_etags(nyc_artifact)
+            fingerprint = hashlib.sha256(json.dumps(sorted((entry["key"], entry["rows"], etags.get(entry["key"]))
+                                                           for entry in entries)).encode()).hexdigest()
+            parameters = {"k": self.data_validation_config.kll_k, "width": self.data_validation_config.count_min_width,
+                          "depth": self.data_validation_config.count_min_depth, "columns": self.new_sketch().columns}
+            if nyc_artifact.s3_key_path_available(self.data_ingestion_artifact.artifact_bucket, sketch_key):
+                stored = nyc_artifact.load_json(self.data_ingestion_artifact.artifact_bucket, sketch_key)
+                if stored["fingerprint"] == fingerprint and stored["parameters"] == parameters:
+                    logging.info(f"Loaded the reference sketch of {len(entries)} training files from {sketch_key}")
+                    return DatasetSketch.from_dict(stored["sketch"])
+
+            reference = self.new_sketch()
+            for sketch in self.sketch_files(dataset, entries).values():
+                reference.merge(sketch)
+            nyc_artifact.save_json({"fingerprint": fingerprint, "parameters": parameters, "sketch": reference.to_dict()},
+                                   self.data_ingestion_artifact.artifact_bucket, sketch_key)
+            logging.info(f"Built the reference sketch of {reference.rows} rows in {len(entries)} training files into {sketch_key}")
+            return reference
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def detect_dataset_drift(self, dataset: DatasetReader) -> bool:
+        """
+        Method Name :   detect_dataset_drift
+        Description :   This method compares every month written by the latest ingestion with the reference
+                        training data, the training files ingested before it, in one streaming pass over the
+                        new files. Each drift column gets a PSI score, and a KS statistic for quantile
+                        sketches; a month drifts when at least drift_share of its columns do. When there
+                        is no earlier training data the test split is compared with the training split.
+
+        Output      :   Returns bool value based on validation results
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_validation_config
+            train_split = self.data_ingestion_artifact.train_split
+            ingested_sources = set(self.data_ingestion_artifact.ingested_sources)
+            files = dataset.manifest["files"]
+            current_entries = [entry for entry in files if entry.get("source_key") in ingested_sources]
+            reference_entries = [entry for entry in files if entry["split"] == train_split and entry.get("source_key") not in ingested_sources]
+            if not current_entries or not reference_entries:
+                current_entries = [entry for entry in files if entry["split"] == self.data_ingestion_artifact.test_split]
+                reference_entries = [entry for entry in files if entry["split"] == train_split]
+
+            reference = self.load_reference_sketch(dataset, reference_entries)
+            ranges = self._schema_config["validation_rules"]["ranges"]
+            frequency_domains = {column: np.arange(ranges[column][0], ranges[column][1] + 1)
+                                 for column in self._schema_config["drift_columns"]["frequencies"]}
+
+            months = {}
+            for label, sketch in sorted(self.sketch_files(dataset, current_entries).items()):
+                scores = reference.drift(sketch, config.drift_bins, frequency_domains)
+                for score in scores.values():
+                    score["drifted"] = score["psi"] > config.drift_psi_threshold or score.get("ks", 0) > config.drift_ks_threshold
+                drifted_features = [column for column, score in scores.items() if score["drifted"]]
+                months[label] = {"rows": sketch.rows, "features": scores, "drifted_features": drifted_features,
+                                 "drift": bool(scores) and len(drifted_features) / len(scores) >= config.drift_share}
+                logging.info(f"{len(drifted_features)}/{len(scores)} drift detected in {label}: {drifted_features}")
+
+            drift_status = any(month["drift"] for month in months.values())
+            write_yaml_file(file_path=config.drift_report_file_path, replace=True,
+                            content={"drift": drift_status, "reference_rows": reference.rows,
+                                     "reference_files": len(reference_entries), "months": months})
+            return drift_status
+        except Exception as e:
+            raise NycException(e, sys) from e
+
+    def validation_fingerprint(self, nyc_artifact: SimpleStorageService, dataset: DatasetReader) -> Optional[str]:
+        """
+        Method Name :   validation_fingerprint
+        Description :   This method fingerprints the inputs of a validation: the ETags of the dataset files, listed
+                        in one pass below the dataset root, the hash of schema.yaml, the validation configuration
+                        and the sources of the latest ingestion, which the drift check compares against the rest
+
+        Output      :   Returns the fingerprint, or None when a file of the manifest is missing
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            etags = self.dataset_file_etags(nyc_artifact)
+            files = [(entry["key"], etags.get(entry["key"])) for entry in dataset.manifest["files"]]
+            if any(etag is None for _, etag in files):
+                return None
+            with open(SCHEMA_FILE_PATH, "rb") as schema_file:
+                schema_hash = hashlib.sha256(schema_file.read()).hexdigest()
+            inputs = {"files": sorted(files), "schema": schema_hash, "config": asdict(self.data_validation_config),
+                      "train_split": self.data_ingestion_artifact.train_split, "test_split": self.data_ingestion_artifact.test_split,
+                      "ingested_sources": sorted(self.data_ingestion_artifact.ingested_sources)}
+            return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-    #         data_drift_profile.calculate(reference_df, current_df)
+    def result_cache_key(self) -> str:
+        return posixpath.join(posixpath.dirname(self.data_ingestion_artifact.manifest_key), DATA_VALIDATION_RESULT_CACHE_FILE_NAME)
 
-    #         report = data_drift_profile.json()
-    #         json_report = json.loads(report)
+    def load_cached_result(self, nyc_artifact: SimpleStorageService, fingerprint: str) -> Optional[DataValidationArtifact]:
+        """
+        Method Name :   load_cached_result
+        Description :   This method returns the stored artifact of a validation with the same fingerprint, and
+                        restores its local report files
 
-    #         write_yaml_file(file_path=self.data_validation_config.drift_report_file_path, content=json_report)
+        Output      :   Returns the cached data validation artifact, or None on a miss
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            bucket_name, cache_key = self.data_ingestion_artifact.artifact_bucket, self.result_cache_key()
+            if not nyc_artifact.s3_key_path_available(bucket_name, cache_key):
+                return None
+            cached = nyc_artifact.load_json(bucket_name, cache_key)
+            if cached["fingerprint"] != fingerprint:
+                return None
+            for file_path, content in cached["reports"].items():
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, "w") as report_file:
+                    report_file.write(content)
+            return DataValidationArtifact(**cached["artifact"])
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-    #         n_features = json_report["data_drift"]["data"]["metrics"]["n_features"]
-    #         n_drifted_features = json_report["data_drift"]["data"]["metrics"]["n_drifted_features"]
+    def save_cached_result(self, nyc_artifact: SimpleStorageService, fingerprint: str, data_validation_artifact: DataValidationArtifact) -> None:
+        """
+        Method Name :   save_cached_result
+        Description :   This method stores the artifact and the report files of a validation next to the dataset,
+                        under the fingerprint of its inputs
 
-    #         logging.info(f"{n_drifted_features}/{n_features} drift detected.")
-    #         drift_status = json_report["data_drift"]["data"]["metrics"]["dataset_drift"]
-    #         return drift_status
-    #     except Exception as e:
-    #         raise NycException(e, sys) from e
+        Output      :   None
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            reports = {}
+            for file_path in (data_validation_artifact.validation_report_file_path, data_validation_artifact.drift_report_file_path):
+                if file_path is not None:
+                    with open(file_path) as report_file:
+                        reports[file_path] = report_file.read()
+            nyc_artifact.save_json({"fingerprint": fingerprint, "artifact": asdict(data_validation_artifact), "reports": reports},
+                                   self.data_ingestion_artifact.artifact_bucket, self.result_cache_key())
+        except Exception as e:
+            raise NycException(e, sys) from e
 
     def initiate_data_validation(self) -> DataValidationArtifact:
         """
         Method Name :   initiate_data_validation
-        Description :   This method initiates the data validation component for the pipeline
+        Description :   This method initiates the data validation component for the pipeline. A rerun on the same
+                        dataset files, schema and configuration returns the stored result of the last validation
         
         Output      :   Returns bool value based on validation results
         On Failure  :   Write an exception log and then raise an exception
         """
 
         try:
-            validation_error_msg = ""
             logging.info("Starting data validation")
             nyc_artifact = SimpleStorageService()
-            # train_df, test_df = (DataValidation.read_data(file_path=self.data_ingestion_artifact.trained_file_key),
-            #                      DataValidation.read_data(file_path=self.data_ingestion_artifact.test_file_key))
-            train_df = nyc_artifact.read_parquet_from_s3(source_bucket_name= self.data_ingestion_artifact.artifact_bucket, source_file_key= self.data_ingestion_artifact.trained_file_key)
-            test_df = nyc_artifact.read_parquet_from_s3(source_bucket_name= self.data_ingestion_artifact.artifact_bucket, source_file_key= self.data_ingestion_artifact.test_file_key)
+            dataset = nyc_artifact.load_dataset(bucket_name= self.data_ingestion_artifact.artifact_bucket, manifest_key= self.data_ingestion_artifact.manifest_key)
+            fingerprint = self.validation_fingerprint(nyc_artifact, dataset) if self.data_validation_config.result_cache else None
+            if fingerprint is not None:
+                data_validation_artifact = self.load_cached_result(nyc_artifact, fingerprint)
+                if data_validation_artifact is not None:
+                    logging.info(f"Dataset unchanged since the last validation, reused its result: {data_validation_artifact}")
+                    return data_validation_artifact
+
+            data_validation_artifact = self.validate_dataset(dataset)
+            if fingerprint is not None:
+                self.save_cached_result(nyc_artifact, fingerprint, data_validation_artifact)
 
-            status = self.validate_number_of_columns(dataframe=train_df)
-            logging.info(f"All required columns present in training dataframe: {status}")
-            if not status:
-                validation_error_msg += f"Columns are missing in training dataframe."
-            status = self.validate_number_of_columns(dataframe=test_df)
-
-            logging.info(f"All required columns present in testing dataframe: {status}")
-            if not status:
-                validation_error_msg += f"Columns are missing in test dataframe."
-
-            status = self.is_column_exist(df=train_df)
+            logging.info(f"Data validation artifact: {data_validation_artifact}")
+            return data_validation_artifact
+        except Exception as e:
+            raise NycException(e, sys) from e
 
-            if not status:
-                validation_error_msg += f"Columns are missing in training dataframe."
-            status = self.is_column_exist(df=test_df)
+    def validate_dataset(self, dataset: DatasetReader) -> DataValidationArtifact:
+        """
+        Method Name :   validate_dataset
+        Description :   This method validates the footers, the content and the drift of the ingested dataset
+        
+        Output      :   Returns the data validation artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
 
-            if not status:
-                validation_error_msg += f"columns are missing in test dataframe."
+        try:
+            validation_error_msg = ""
+            validation_report = {}
+            # the footers are validated first; only when they pass, and their statistics cannot settle
+            # the rules by themselves, is the data itself streamed
+            for split, name in ((self.data_ingestion_artifact.train_split, "training"), (self.data_ingestion_artifact.test_split, "test")):
+                metadata_error_msg, footers = self.validate_metadata(dataset, split, name)
+                logging.info(f"Footer metadata of {name} dataframe is valid: {not metadata_error_msg}")
+                validation_error_msg += metadata_error_msg
+                content_check = None if metadata_error_msg else self.content_check_plan(footers, name)
+                if content_check is not None:
+                    rules, columns = content_check
+                    content_error_msg, validation_report[name] = self.validate_content(dataset, split, name, footers, rules, columns)
+                    logging.info(f"Content of {name} dataframe is valid: {not content_error_msg}")
+                    validation_error_msg += content_error_msg
+            validation_report_file_path = None
+            if validation_report:
+                validation_report_file_path = self.data_validation_config.validation_report_file_path
+                write_yaml_file(file_path=validation_report_file_path, content=validation_report, replace=True)
+                logging.info(f"Validation report written to {validation_report_file_path}")
 
             validation_status = len(validation_error_msg) == 0
 
-            # if validation_status:
-            #     drift_status = self.detect_dataset_drift(train_df, test_df)
-            #     if drift_status:
-            #         logging.info(f"Drift detected.")
-            #         validation_error_msg = "Drift detected"
-            #     else:
-            #         validation_error_msg = "Drift not detected"
-            # else:
-            #     logging.info(f"Validation_error: {validation_error_msg}")
+            drift_status, drift_report_file_path = None, None
+            if validation_status and self.data_validation_config.drift_check:
+                drift_status = self.detect_dataset_drift(dataset)
+                drift_report_file_path = self.data_validation_config.drift_report_file_path
+                if drift_status:
+                    logging.info(f"Drift detected.")
+                    validation_error_msg = "Drift detected"
+                else:
+                    validation_error_msg = "Drift not detected"
 
             if validation_status:
                 logging.info(f"Validation Successful")
@@ -169,11 +540,12 @@ class DataValidation:
 
             data_validation_artifact = DataValidationArtifact(
                 validation_status=validation_status,
-                message=validation_error_msg
-                # drift_report_file_path=self.data_validation_config.drift_report_file_path
+                message=validation_error_msg,
+                validation_report_file_path=validation_report_file_path,
+                drift_status=drift_status,
+                drift_report_file_path=drift_report_file_path
             )
 
-            logging.info(f"Data validation artifact: {data_validation_artifact}")
             return data_validation_artifact
         except Exception as e:
             raise NycException(e, sys) from e
@@ -12,7 +12,7 @@ from typing import Optional
 from nyc_taxi_trips.entity.s3_estimator import NycEstimator
 from dataclasses import dataclass
 from nyc_taxi_trips.entity.estimator import NycModel
-from nyc_taxi_trips.utils.main_utils import drop_columns, read_yaml_file
+from nyc_taxi_trips.utils.main_utils import drop_columns, read_yaml_file, get_required_columns, get_row_filters
 
 @dataclass
 class EvaluateModelResponse:
@@ -64,13 +64,11 @@ class ModelEvaluation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            drop_cols = self._schema_config['drop_columns']
             eva = SimpleStorageService()
-            test_df = eva.read_parquet_from_s3(source_file_key=self.data_ingestion_artifact.test_file_key, source_bucket_name = self.data_ingestion_artifact.artifact_bucket)
-            test_df = test_df[test_df['passenger_count'] > 0]
-            test_df = test_df[test_df['trip_distance'] > 0]
-            test_df = test_df[test_df['fare_amount'] > 0]
-            test_df = test_df[test_df['total_amount'] > 0]
+            dataset = eva.load_dataset(bucket_name=self.data_ingestion_artifact.artifact_bucket, manifest_key=self.data_ingestion_artifact.manifest_key)
+            test_df = dataset.read(self.data_ingestion_artifact.test_split,
+                                   columns=get_required_columns(self._schema_config), filters=get_row_filters(self._schema_config))
+            drop_cols = [col for col in self._schema_config['drop_columns'] if col in test_df.columns]
             test_df['tpep_pickup_datetime'] = test_df['tpep_pickup_datetime'].astype('datetime64[ns]')
             test_df['tpep_dropoff_datetime'] = test_df['tpep_dropoff_datetime'].astype('datetime64[ns]')
             test_df['duration'] = test_df['tpep_dropoff_datetime'] - test_df['tpep_pickup_datetime']
@@ -36,8 +36,7 @@ class ModelPusher:
             logging.info("Uploading artifacts folder to s3 bucket")
 
             self.nyc_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_key,
-                                          from_bucket=self.model_evaluation_artifact.artifact_bucket,
-                                          remove=True)
+                                          from_bucket=self.model_evaluation_artifact.artifact_bucket)
 
 
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
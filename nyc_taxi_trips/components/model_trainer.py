@@ -1,5 +1,5 @@
 import sys
-from typing import Tuple
+from typing import Iterable, Tuple
 
 import numpy as np
 import pandas as pd
@@ -14,7 +14,7 @@ from nyc_taxi_trips.utils.main_utils import load_numpy_array_data, read_yaml_fil
 from nyc_taxi_trips.entity.config_entity import ModelTrainerConfig
 from nyc_taxi_trips.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, RegressionMetricArtifact
 from nyc_taxi_trips.entity.estimator import NycModel
-from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
+from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService, TransferRequest
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact,
@@ -26,10 +26,11 @@ class ModelTrainer:
         self.data_transformation_artifact = data_transformation_artifact
         self.model_trainer_config = model_trainer_config
 
-    def get_model_object_and_report(self, train: np.array, test: np.array) -> Tuple[object, object]:
+    def get_model_object_and_report(self, x_train: np.array, y_train: np.array, test_shards: Iterable[Tuple[np.array, np.array]]) -> Tuple[object, object]:
         """
         Method Name :   get_model_object_and_report
-        Description :   This function uses neuro_mf to get the best model object and report of the best model
+        Description :   This function uses neuro_mf to get the best model object and report of the best model,
+                        scored shard by shard on the (x_test, y_test) pairs of test_shards
         
         Output      :   Returns metric artifact object and best model object
         On Failure  :   Write an exception log and then raise an exception
@@ -37,15 +38,17 @@ class ModelTrainer:
         try:
             logging.info("Using neuro_mf to get best model object and report")
             model_factory = ModelFactory(model_config_path=self.model_trainer_config.model_config_file_path)
-            
-            x_train, y_train, x_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
 
             best_model_detail = model_factory.get_best_model(
                 X=x_train,y=y_train,base_accuracy=self.model_trainer_config.expected_accuracy
             )
             model_obj = best_model_detail.best_model
 
-            y_pred = model_obj.predict(x_test)
+            y_test, y_pred = [], []
+            for x_test_shard, y_test_shard in test_shards:
+                y_test.append(np.asarray(y_test_shard))
+                y_pred.append(model_obj.predict(x_test_shard))
+            y_test, y_pred = np.concatenate(y_test), np.concatenate(y_pred)
             
             r2 = r2_score(y_test, y_pred) 
             rmse = root_mean_squared_error(y_test, y_pred)  
@@ -69,12 +72,15 @@ class ModelTrainer:
         """
         try:
             mod = SimpleStorageService()
-            train_arr = mod.load_array_from_s3(source_bucket_name= self.data_transformation_artifact.artifact_bucket, source_file_key= self.data_transformation_artifact.transformed_train_file_key)
-            test_arr = mod.load_array_from_s3(source_bucket_name= self.data_transformation_artifact.artifact_bucket, source_file_key= self.data_transformation_artifact.transformed_test_file_key)
-            
-            best_model_detail ,metric_artifact = self.get_model_object_and_report(train=train_arr, test=test_arr)
+            train_shards, test_shards, preprocessing_obj = mod.get_many([
+                TransferRequest("shards", self.data_transformation_artifact.artifact_bucket, self.data_transformation_artifact.transformed_train_file_key),
+                TransferRequest("shards", self.data_transformation_artifact.artifact_bucket, self.data_transformation_artifact.transformed_test_file_key),
+                TransferRequest("object", self.data_transformation_artifact.artifact_bucket, self.data_transformation_artifact.transformed_object_file_key),
+            ])
             
-            preprocessing_obj = mod.load_object_from_s3(source_bucket_name= self.data_transformation_artifact.artifact_bucket, source_file_key=self.data_transformation_artifact.transformed_object_file_key)
+            # neuro_mf fits on whole arrays, so only the train split is consolidated
+            best_model_detail ,metric_artifact = self.get_model_object_and_report(x_train=train_shards.features(), y_train=train_shards.target(),
+                                                                                   test_shards=test_shards.iter_shards())
 
 
             if best_model_detail.best_score < self.model_trainer_config.expected_accuracy:
@@ -1,37 +1,76 @@
 
 import boto3
 import os
-from nyc_taxi_trips.constants import AWS_SECRET_ACCESS_KEY_ENV_KEY, AWS_ACCESS_KEY_ID_ENV_KEY,REGION_NAME
+import threading
+from botocore.config import Config
+from nyc_taxi_trips.constants import AWS_SECRET_ACCESS_KEY_ENV_KEY, AWS_ACCESS_KEY_ID_ENV_KEY,REGION_NAME,S3_ENDPOINT_URL_ENV_KEY
+from nyc_taxi_trips.entity.config_entity import S3ConnectionConfig
+from nyc_taxi_trips.cloud_actions.throttle import AdaptiveConcurrencyLimiter
 
 
 class S3Client:
 
-    s3_client=None
-    s3_resource = None
-    def __init__(self, region_name=REGION_NAME):
-        """ 
-        This Class gets aws credentials from env_variable and creates an connection with s3 bucket 
-        and raise exception when environment variable is not set
+    _clients = {}
+    _limiters = {}
+    _lock = threading.Lock()
+    _local = threading.local()
+
+    def __init__(self, region_name=REGION_NAME, connection_config: S3ConnectionConfig = S3ConnectionConfig()):
+        """
+        This Class gets aws credentials from env_variable and creates an connection with s3 bucket
+        and raise exception when environment variable is not set.
+        Set AWS_S3_ENDPOINT_URL to talk to an S3 compatible stand-in such as MinIO or moto.
+
+        The low level client is thread safe and shared by the whole process, with a connection pool
+        sized by connection_config. boto3 resources are not thread safe, so every thread gets its own.
+        With adaptive_concurrency, requests on the client are gated by an AIMD concurrency limiter.
         """
 
-        if S3Client.s3_resource==None or S3Client.s3_client==None:
-            __access_key_id = os.getenv(AWS_ACCESS_KEY_ID_ENV_KEY, )
-            __secret_access_key = os.getenv(AWS_SECRET_ACCESS_KEY_ENV_KEY, )
-            if __access_key_id is None:
-                raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not not set.")
-            if __secret_access_key is None:
-                raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set.")
-        
-            S3Client.s3_resource = boto3.resource('s3',
-                                            aws_access_key_id=__access_key_id,
-                                            aws_secret_access_key=__secret_access_key,
-                                            region_name=region_name
-                                            )
-            S3Client.s3_client = boto3.client('s3',
-                                        aws_access_key_id=__access_key_id,
-                                        aws_secret_access_key=__secret_access_key,
-                                        region_name=region_name
-                                        )
-        self.s3_resource = S3Client.s3_resource
-        self.s3_client = S3Client.s3_client
-        
+        __access_key_id = os.getenv(AWS_ACCESS_KEY_ID_ENV_KEY, )
+        __secret_access_key = os.getenv(AWS_SECRET_ACCESS_KEY_ENV_KEY, )
+        if __access_key_id is None:
+            raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not not set.")
+        if __secret_access_key is None:
+            raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set.")
+
+        self.session_kwargs = dict(aws_access_key_id=__access_key_id,
+                                   aws_secret_access_key=__secret_access_key,
+                                   region_name=region_name)
+        self.endpoint_url = os.getenv(S3_ENDPOINT_URL_ENV_KEY)
+        self.botocore_config = Config(
+            max_pool_connections=connection_config.max_pool_connections,
+            tcp_keepalive=connection_config.tcp_keepalive,
+            connect_timeout=connection_config.connect_timeout,
+            read_timeout=connection_config.read_timeout,
+            retries={"mode": connection_config.retry_mode, "total_max_attempts": connection_config.max_attempts},
+        )
+        self.cache_key = (__access_key_id, region_name, self.endpoint_url, connection_config)
+
+        with S3Client._lock:
+            if self.cache_key not in S3Client._clients:
+                # sessions are not thread safe either, so clients are created under the lock
+                s3_client = boto3.session.Session(**self.session_kwargs).client(
+                    's3', endpoint_url=self.endpoint_url, config=self.botocore_config)
+                if connection_config.adaptive_concurrency:
+                    limiter = AdaptiveConcurrencyLimiter(initial_limit=connection_config.initial_concurrency,
+                                                         min_limit=connection_config.min_concurrency,
+                                                         max_limit=min(connection_config.max_concurrency,
+                                                                       connection_config.max_pool_connections))
+                    limiter.attach(s3_client)
+                    S3Client._limiters[self.cache_key] = limiter
+                S3Client._clients[self.cache_key] = s3_client
+        self.s3_client = S3Client._clients[self.cache_key]
+        self.limiter = S3Client._limiters.get(self.cache_key)
+
+    @property
+    def s3_resource(self):
+        """
+        The boto3 resource of the calling thread, created on first use from its own session
+        """
+        resources = getattr(S3Client._local, "resources", None)
+        if resources is None:
+            resources = S3Client._local.resources = {}
+        if self.cache_key not in resources:
+            resources[self.cache_key] = boto3.session.Session(**self.session_kwargs).resource(
+                's3', endpoint_url=self.endpoint_url, config=self.botocore_config)
+        return resources[self.cache_key]
@@ -1,6 +1,7 @@
 
 import os
 from datetime import date
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,9 +26,38 @@ SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 
 
 
+STORAGE_BACKEND_ENV_KEY = "STORAGE_BACKEND"
+LOCAL_STORAGE_ROOT_ENV_KEY = "LOCAL_STORAGE_ROOT"
+LOCAL_STORAGE_ROOT: str = "local_storage"
+
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY_ENV_KEY = "AWS_SECRET_ACCESS_KEY"
 REGION_NAME = "us-east-1"
+S3_ENDPOINT_URL_ENV_KEY = "AWS_S3_ENDPOINT_URL"
+S3_MAX_POOL_CONNECTIONS: int = 64
+S3_TCP_KEEPALIVE: bool = True
+S3_CONNECT_TIMEOUT_SECONDS: float = 5.0
+S3_READ_TIMEOUT_SECONDS: float = 60.0
+S3_RETRY_MODE: str = "adaptive"
+S3_MAX_ATTEMPTS: int = 10
+S3_ADAPTIVE_CONCURRENCY: bool = True
+S3_INITIAL_CONCURRENCY: int = 16
+S3_MIN_CONCURRENCY: int = 2
+S3_MAX_ADAPTIVE_CONCURRENCY: int = 64
+S3_SPOOL_MAX_MEMORY_SIZE: int = 256 * 1024 * 1024
+S3_MULTIPART_THRESHOLD: int = 64 * 1024 * 1024
+S3_MULTIPART_PART_SIZE: int = 16 * 1024 * 1024
+S3_MAX_CONCURRENCY: int = 16
+S3_MAX_SINGLE_COPY_SIZE: int = 5 * 1024 * 1024 * 1024
+S3_BULK_MAX_WORKERS: int = 8
+S3_CACHE_ENABLED: bool = True
+S3_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "s3_cache")
+S3_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024
+S3_HEAD_MEMO_TTL_SECONDS: float = 30.0
+SOURCE_MANIFEST_DIR: str = os.path.join(ARTIFACT_DIR, "manifests")
+SOURCE_MANIFEST_TTL_SECONDS: int = 15 * 60
+SOURCE_LISTING_FAN_OUT_DEPTH: int = 0
+SOURCE_LISTING_MAX_WORKERS: int = 16
 
 
 
@@ -39,6 +69,38 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_CHUNK_SIZE: int = 500_000
+DATA_INGESTION_PARQUET_COMPRESSION: str = "zstd"
+DATA_INGESTION_PARQUET_COMPRESSION_LEVEL: int = 3
+DATA_INGESTION_PARQUET_ROW_GROUP_SIZE: int = 128 * 1024
+# None dictionary encodes every column, a list only the listed ones
+DATA_INGESTION_PARQUET_DICTIONARY_COLUMNS: list = None
+# hash key of the train/test split, exactly 16 characters; changing it reshuffles the split and
+# makes the next ingestion re-ingest every source file
+DATA_INGESTION_SPLIT_HASH_KEY: str = "nyc-taxi-trips01"
+DATA_INGESTION_INCREMENTAL: bool = True
+DATA_INGESTION_SOURCE_CACHE_ENABLED: bool = True
+DATA_INGESTION_SOURCE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "source_cache")
+DATA_INGESTION_MAX_WORKERS: int = os.cpu_count() or 1
+DATA_INGESTION_WORKER_MEMORY_BYTES: int = 1024 * 1024 * 1024
+# rough in-memory size of one source row while its chunk is parsed, datetime strings included,
+# used to size chunks to the memory budget
+DATA_INGESTION_ROW_MEMORY_BYTES: int = 250
+DATA_INGESTION_LEDGER_FILE_NAME: str = "ledger.json"
+DATA_INGESTION_LEDGER_VERSION: int = 1
+DATA_INGESTION_SAMPLE_DIR_NAME: str = "data_ingestion_sample"
+# validation reports, transformed arrays and models of a sample run are stored below this prefix
+SAMPLE_ARTIFACT_DIR_NAME: str = "sample"
+# hash key of the sample, exactly 16 characters; it must differ from the split hash key, so the
+# sample is drawn independently of the train/test split
+DATA_INGESTION_SAMPLE_HASH_KEY: str = "nyc-taxi-sample1"
+# share of extra rows kept as sample candidates, so strata can still be filled exactly at the end
+DATA_INGESTION_SAMPLE_OVERSAMPLING: float = 0.2
+DATA_INGESTION_TRAIN_SPLIT: str = "train"
+DATA_INGESTION_TEST_SPLIT: str = "test"
+DATASET_MANIFEST_FILE_NAME: str = "_manifest.json"
+DATA_INGESTION_MAX_OPEN_PARTITION_FILES: int = 16
+DATA_INGESTION_MAX_ROWS_PER_FILE: int = 2_000_000
 TRAIN_FILE_KEY: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}/{TRAIN_FILE_NAME}"
 TEST_FILE_KEY: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}/{TEST_FILE_NAME}"
 
@@ -49,6 +111,25 @@ Data Validation realted contant start with DATA_VALIDATION VAR NAME
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_REPORT_FILE_NAME: str = "validation_report.yaml"
+# the footer metadata is always validated; the content check streams the row groups through the
+# schema validation_rules. None streams only the columns of the domain and order rules and of the
+# range rules the footer statistics do not prove, True streams every column for every rule, False
+# never streams
+DATA_VALIDATION_CONTENT_CHECK: Optional[bool] = None
+# drift of the newly ingested months from the training data, measured with mergeable sketches
+DATA_VALIDATION_DRIFT_CHECK: bool = True
+DATA_VALIDATION_REFERENCE_SKETCH_FILE_NAME: str = "_reference_sketch.json"
+DATA_VALIDATION_KLL_K: int = 200
+DATA_VALIDATION_COUNT_MIN_WIDTH: int = 2048
+DATA_VALIDATION_COUNT_MIN_DEPTH: int = 4
+DATA_VALIDATION_DRIFT_BINS: int = 10
+DATA_VALIDATION_DRIFT_PSI_THRESHOLD: float = 0.2
+DATA_VALIDATION_DRIFT_KS_THRESHOLD: float = 0.1
+DATA_VALIDATION_DRIFT_SHARE: float = 0.5
+# validation results are reused while the dataset files, schema.yaml and this configuration are unchanged
+DATA_VALIDATION_RESULT_CACHE_ENABLED: bool = True
+DATA_VALIDATION_RESULT_CACHE_FILE_NAME: str = "_validation_result.json"
 
 
 
@@ -59,6 +140,10 @@ Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_TRAIN_DIR: str = "train"
+DATA_TRANSFORMATION_TEST_DIR: str = "test"
+ARRAY_SHARD_INDEX_FILE_NAME: str = "index.json"
+ARRAY_SHARD_ROWS: int = 1_000_000
 
 
 """
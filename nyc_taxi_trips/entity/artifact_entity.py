@@ -1,12 +1,18 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
 class DataIngestionArtifact:
-    trained_file_key:str 
-    test_file_key:str 
+    manifest_key: str
+    train_split: str
+    test_split: str
     artifact_bucket: str
+    ingested_sources: List[str] = field(default_factory=list)
+    removed_sources: List[str] = field(default_factory=list)
+    # True when a training run on the current dataset finished, see DataIngestion.mark_trained
+    trained: bool = False
 
 
 
@@ -14,7 +20,9 @@ class DataIngestionArtifact:
 class DataValidationArtifact:
     validation_status:bool
     message: str
-    # drift_report_file_path: str
+    validation_report_file_path: Optional[str] = None
+    drift_status: Optional[bool] = None
+    drift_report_file_path: Optional[str] = None
 
 
 
@@ -1,6 +1,7 @@
 import os
 from nyc_taxi_trips.constants import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 from datetime import datetime
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -17,13 +18,96 @@ training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
 
 
+@dataclass(frozen=True)
+class S3ConnectionConfig:
+    max_pool_connections: int = S3_MAX_POOL_CONNECTIONS
+    tcp_keepalive: bool = S3_TCP_KEEPALIVE
+    connect_timeout: float = S3_CONNECT_TIMEOUT_SECONDS
+    read_timeout: float = S3_READ_TIMEOUT_SECONDS
+    retry_mode: str = S3_RETRY_MODE
+    max_attempts: int = S3_MAX_ATTEMPTS
+    adaptive_concurrency: bool = S3_ADAPTIVE_CONCURRENCY
+    initial_concurrency: int = S3_INITIAL_CONCURRENCY
+    min_concurrency: int = S3_MIN_CONCURRENCY
+    max_concurrency: int = S3_MAX_ADAPTIVE_CONCURRENCY
+
+
+
+@dataclass
+class S3TransferConfig:
+    multipart_threshold: int = S3_MULTIPART_THRESHOLD
+    part_size: int = S3_MULTIPART_PART_SIZE
+    max_concurrency: int = S3_MAX_CONCURRENCY
+
+
+
+@dataclass
+class S3CacheConfig:
+    enabled: bool = S3_CACHE_ENABLED
+    cache_dir: str = S3_CACHE_DIR
+    max_bytes: int = S3_CACHE_MAX_BYTES
+
+
+
+
+@dataclass
+class SourceListingConfig:
+    manifest_dir: str = SOURCE_MANIFEST_DIR
+    ttl_seconds: int = SOURCE_MANIFEST_TTL_SECONDS
+    fan_out_depth: int = SOURCE_LISTING_FAN_OUT_DEPTH
+    max_workers: int = SOURCE_LISTING_MAX_WORKERS
+
+
+
+@dataclass
+class ParquetEncodingConfig:
+    compression: str = DATA_INGESTION_PARQUET_COMPRESSION
+    compression_level: Optional[int] = DATA_INGESTION_PARQUET_COMPRESSION_LEVEL
+    row_group_size: int = DATA_INGESTION_PARQUET_ROW_GROUP_SIZE
+    dictionary_columns: Optional[List[str]] = DATA_INGESTION_PARQUET_DICTIONARY_COLUMNS
+
+
+
 @dataclass
 class DataIngestionConfig:
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
+    split_hash_key: str = DATA_INGESTION_SPLIT_HASH_KEY
     data_bucket_name: str = DATA_BUCKET_NAME
     artifact_bucket_name: str = ARTIFACT_BUCKET_NAME
-    training_file_key: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}/{TRAIN_FILE_NAME}"
-    testing_file_key: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}/{TEST_FILE_NAME}"
+    dataset_root_key: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}"
+    manifest_key: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}/{DATASET_MANIFEST_FILE_NAME}"
+    ledger_key: str = f"{DATA_INGESTION_DIR_NAME}/{DATA_INGESTION_LEDGER_FILE_NAME}"
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    source_cache_enabled: bool = DATA_INGESTION_SOURCE_CACHE_ENABLED
+    source_cache_dir: str = DATA_INGESTION_SOURCE_CACHE_DIR
+    max_workers: int = DATA_INGESTION_MAX_WORKERS
+    worker_memory_bytes: int = DATA_INGESTION_WORKER_MEMORY_BYTES
+    train_split: str = DATA_INGESTION_TRAIN_SPLIT
+    test_split: str = DATA_INGESTION_TEST_SPLIT
+    chunk_size: int = DATA_INGESTION_CHUNK_SIZE
+    max_open_partition_files: int = DATA_INGESTION_MAX_OPEN_PARTITION_FILES
+    max_rows_per_file: int = DATA_INGESTION_MAX_ROWS_PER_FILE
+    parquet_encoding: ParquetEncodingConfig = field(default_factory=ParquetEncodingConfig)
+    sample_fraction: Optional[float] = None
+    sample_rows: Optional[int] = None
+    sample_hash_key: str = DATA_INGESTION_SAMPLE_HASH_KEY
+    sample_oversampling: float = DATA_INGESTION_SAMPLE_OVERSAMPLING
+
+    @property
+    def is_sample(self) -> bool:
+        return self.sample_fraction is not None or self.sample_rows is not None
+
+    @classmethod
+    def sample(cls, sample_fraction: Optional[float] = None, sample_rows: Optional[int] = None, **kwargs) -> "DataIngestionConfig":
+        """
+        configuration of a stratified sample of sample_fraction of the rows, or of about sample_rows
+        rows, ingested below DATA_INGESTION_SAMPLE_DIR_NAME instead of the full dataset
+        """
+        if (sample_fraction is None) == (sample_rows is None):
+            raise ValueError("Give exactly one of sample_fraction and sample_rows")
+        root_key = f"{DATA_INGESTION_SAMPLE_DIR_NAME}/{DATA_INGESTION_INGESTED_DIR}"
+        return cls(dataset_root_key=root_key, manifest_key=f"{root_key}/{DATASET_MANIFEST_FILE_NAME}",
+                   sample_fraction=sample_fraction, sample_rows=sample_rows, **kwargs)
 
 
 
@@ -32,6 +116,30 @@ class DataValidationConfig:
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     drift_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
                                                DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+    validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    content_check: Optional[bool] = DATA_VALIDATION_CONTENT_CHECK
+    drift_check: bool = DATA_VALIDATION_DRIFT_CHECK
+    kll_k: int = DATA_VALIDATION_KLL_K
+    count_min_width: int = DATA_VALIDATION_COUNT_MIN_WIDTH
+    count_min_depth: int = DATA_VALIDATION_COUNT_MIN_DEPTH
+    drift_bins: int = DATA_VALIDATION_DRIFT_BINS
+    drift_psi_threshold: float = DATA_VALIDATION_DRIFT_PSI_THRESHOLD
+    drift_ks_threshold: float = DATA_VALIDATION_DRIFT_KS_THRESHOLD
+    drift_share: float = DATA_VALIDATION_DRIFT_SHARE
+    result_cache: bool = DATA_VALIDATION_RESULT_CACHE_ENABLED
+
+    @classmethod
+    def sample(cls, **kwargs) -> "DataValidationConfig":
+        """
+        configuration of a sample run, whose reports are written below SAMPLE_ARTIFACT_DIR_NAME
+        instead of over those of the full run
+        """
+        data_validation_dir = os.path.join(training_pipeline_config.artifact_dir, SAMPLE_ARTIFACT_DIR_NAME, DATA_VALIDATION_DIR_NAME)
+        return cls(data_validation_dir=data_validation_dir,
+                   drift_report_file_path=os.path.join(data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR,
+                                                       DATA_VALIDATION_DRIFT_REPORT_FILE_NAME),
+                   validation_report_file_path=os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME),
+                   **kwargs)
     
 
 
@@ -40,9 +148,22 @@ class DataValidationConfig:
 
 @dataclass
 class DataTransformationConfig:
-    transformed_train_file_key: str = f"{DATA_TRANSFORMATION_DIR_NAME}/{DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR}/{TRAIN_FILE_NAME.replace('parquet', 'npy')}"
-    transformed_test_file_key: str = f"{DATA_TRANSFORMATION_DIR_NAME}/{DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR}/{TEST_FILE_NAME.replace('parquet', 'npy')}"
+    transformed_train_file_key: str = f"{DATA_TRANSFORMATION_DIR_NAME}/{DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR}/{DATA_TRANSFORMATION_TRAIN_DIR}/{ARRAY_SHARD_INDEX_FILE_NAME}"
+    transformed_test_file_key: str = f"{DATA_TRANSFORMATION_DIR_NAME}/{DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR}/{DATA_TRANSFORMATION_TEST_DIR}/{ARRAY_SHARD_INDEX_FILE_NAME}"
     transformed_object_file_key: str = f"{DATA_TRANSFORMATION_DIR_NAME}/{DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR}/{PREPROCSSING_OBJECT_FILE_NAME}"
+    shard_rows: int = ARRAY_SHARD_ROWS
+
+    @classmethod
+    def sample(cls, **kwargs) -> "DataTransformationConfig":
+        """
+        configuration of a sample run, whose arrays and preprocessor are stored below
+        SAMPLE_ARTIFACT_DIR_NAME instead of over those of the full run
+        """
+        full_run = cls()
+        return cls(transformed_train_file_key=f"{SAMPLE_ARTIFACT_DIR_NAME}/{full_run.transformed_train_file_key}",
+                   transformed_test_file_key=f"{SAMPLE_ARTIFACT_DIR_NAME}/{full_run.transformed_test_file_key}",
+                   transformed_object_file_key=f"{SAMPLE_ARTIFACT_DIR_NAME}/{full_run.transformed_object_file_key}",
+                   **kwargs)
     
 
 
@@ -55,6 +176,14 @@ class ModelTrainerConfig:
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
     trained_model_file_key: str = f"{MODEL_TRAINER_DIR_NAME}/{MODEL_TRAINER_TRAINED_MODEL_DIR}/{MODEL_FILE_NAME}"
 
+    @classmethod
+    def sample(cls, **kwargs) -> "ModelTrainerConfig":
+        """
+        configuration of a sample run, whose model is stored below SAMPLE_ARTIFACT_DIR_NAME instead
+        of over the one of the full run
+        """
+        return cls(trained_model_file_key=f"{SAMPLE_ARTIFACT_DIR_NAME}/{cls().trained_model_file_key}", **kwargs)
+
 
 
 
@@ -2,8 +2,7 @@
 from nyc_taxi_trips.cloud_actions.aws_actions import SimpleStorageService
 from nyc_taxi_trips.exception import NycException
 from nyc_taxi_trips.entity.estimator import NycModel
-from nyc_taxi_trips.utils.main_utils import save_object
-import sys,os
+import sys
 from pandas import DataFrame
 
 
@@ -38,22 +37,18 @@ class NycEstimator:
 
         return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
 
-    def save_model(self,from_file, from_bucket, remove:bool=False)->None:
+    def save_model(self,from_file, from_bucket)->None:
         """
-        Save the model to the model_path
-        :param from_file: Your local system model path
-        :param remove: By default it is false that mean you will have your model locally available in your system folder
+        Save the model to the model_path with a server side copy, the model is never downloaded
+        :param from_file: Key of the trained model in from_bucket
+        :param from_bucket: Bucket holding the trained model
         :return:
         """
         try:
-            
-            file = self.s3.load_model_from_s3(source_bucket_name=from_bucket,
-                                        source_file_key= from_file)
-            self.s3.upload_file(file,
-                                to_filename=self.model_path,
-                                bucket_name=self.bucket_name,
-                                remove=remove
-                                )
+            self.s3.copy_object(source_bucket_name=from_bucket,
+                                source_file_key=from_file,
+                                target_bucket_name=self.bucket_name,
+                                target_key=self.model_path)
         except Exception as e:
             raise NycException(e, sys)
 
@@ -82,10 +77,6 @@ class NycEstimator:
         """
 
         try:
-            temp_file_path = 'nyc_taxi_trips\cloud_actions\example.pkl'
-            save_object(temp_file_path, obj)
-            # Upload the file
-            self.s3_client.upload_file(temp_file_path, bucket_name, target_key)
-            os.remove(temp_file_path)
+            self.s3.upload_object_to_folder(obj=obj, bucket_name=bucket_name, target_key=target_key)
         except Exception as e:
             raise NycException(e, sys) from e 
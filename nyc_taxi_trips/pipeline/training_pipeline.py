@@ -1,5 +1,6 @@
 import sys
 import os
+from typing import List
 from nyc_taxi_trips.constants import DATA_BUCKET_NAME
 from nyc_taxi_trips.exception import NycException
 from nyc_taxi_trips.logger import logging
@@ -29,25 +30,36 @@ from nyc_taxi_trips.entity.artifact_entity import (DataIngestionArtifact,
 
 
 class TrainPipeline:
-    def __init__(self):
-        self.data_ingestion_config = DataIngestionConfig()
-        self.data_validation_config = DataValidationConfig()
-        self.data_transformation_config = DataTransformationConfig()
-        self.model_trainer_config = ModelTrainerConfig()
+    def __init__(self, data_ingestion_config: DataIngestionConfig = None):
+        """
+        Pass DataIngestionConfig.sample(...) as data_ingestion_config to run the pipeline on a
+        stratified sample of the data; the artifacts of a sample run are kept apart from those of
+        the full run and models trained on a sample are never pushed
+        """
+        self.data_ingestion_config = data_ingestion_config or DataIngestionConfig()
+        if self.data_ingestion_config.is_sample:
+            self.data_validation_config = DataValidationConfig.sample()
+            self.data_transformation_config = DataTransformationConfig.sample()
+            self.model_trainer_config = ModelTrainerConfig.sample()
+        else:
+            self.data_validation_config = DataValidationConfig()
+            self.data_transformation_config = DataTransformationConfig()
+            self.model_trainer_config = ModelTrainerConfig()
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
         
 
 
-    def start_data_ingestion(self, filename: str) -> DataIngestionArtifact:
+    def start_data_ingestion(self, source_files: List[dict]) -> DataIngestionArtifact:
         """
         This method of TrainPipeline class is responsible for starting data ingestion component
         """
         try:
             logging.info("Entered the start_data_ingestion method of TrainPipeline class")
             logging.info("Getting the data from s3 bucket")
-            data_ingestion = DataIngestion(filename= filename, data_ingestion_config=self.data_ingestion_config)
+            data_ingestion = DataIngestion(source_files= source_files, data_ingestion_config=self.data_ingestion_config)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            self.data_ingestion = data_ingestion
             logging.info("Got the train_set and test_set from s3 bucket")
             logging.info(
                 "Exited the start_data_ingestion method of TrainPipeline class"
@@ -150,20 +162,40 @@ class TrainPipeline:
         """
         try:
             data = SimpleStorageService()
-            data_files = data.give_s3_files(bucket_name= DATA_BUCKET_NAME)
-            for f in data_files:
-                data_ingestion_artifact = self.start_data_ingestion(filename= f)
-                data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-                data_transformation_artifact = self.start_data_transformation(
-                    data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
-                model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-                model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                        model_trainer_artifact=model_trainer_artifact)
-                
-                if not model_evaluation_artifact.is_model_accepted:
-                    logging.info(f"Model not accepted.")
+            # an incremental run must see the files added since the cached listing was taken
+            manifest = data.list_source_manifest(bucket_name= DATA_BUCKET_NAME, suffix= ".csv",
+                                                 refresh= self.data_ingestion_config.incremental)
+            data_files = [item for item in manifest if item["size"] > 0]
+            logging.info(f"Planned {len(data_files)} source files with {sum(item['size'] for item in data_files)} bytes, "
+                         f"skipped {len(manifest) - len(data_files)} empty files")
+            data_ingestion_artifact = self.start_data_ingestion(source_files= data_files)
+            if self.data_ingestion_config.incremental and not (data_ingestion_artifact.ingested_sources or data_ingestion_artifact.removed_sources):
+                if data_ingestion_artifact.trained:
+                    logging.info("No new or changed source files since the last finished training run, skipped retraining")
                     return None
-                model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+                logging.info("No new or changed source files, but the last training run did not finish, retraining")
+            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+            data_transformation_artifact = self.start_data_transformation(
+                data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
+            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
+                                                                    model_trainer_artifact=model_trainer_artifact)
+
+            if self.data_ingestion_config.is_sample:
+                logging.info("Trained on a sample of the data, skipped pushing the model")
+                return None
+            if not model_evaluation_artifact.is_model_accepted:
+                logging.info(f"Model not accepted.")
+                # the run finished, retraining on the same data would not change the outcome
+                self.data_ingestion.mark_trained()
+                return None
+            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+            self.data_ingestion.mark_trained()
+
+            if data.cache is not None:
+                logging.info(f"S3 cache statistics: {data.cache.stats()}")
+            if data.limiter is not None:
+                logging.info(f"S3 request statistics: {data.limiter.stats()}")
   
 
         except Exception as e:
@@ -1,9 +1,11 @@
+import hashlib
 import os
 import sys
 
 import numpy as np
 import dill
 import yaml
+import pandas as pd
 from pandas import DataFrame
 
 from nyc_taxi_trips.exception import NycException
@@ -119,6 +121,223 @@ def drop_columns(df: DataFrame, cols: list)-> DataFrame:
 
 
 
+def get_required_columns(schema_config: dict) -> list:
+    """
+    columns of the ingested data used by transformation and evaluation
+    schema_config: parsed schema.yaml
+    return: every schema column that is not dropped, plus the datetime columns features are derived from
+    """
+    drop_cols = schema_config["drop_columns"]
+    columns = [name for column in schema_config["columns"] for name in column]
+    return [name for name in columns if name not in drop_cols or name in schema_config["datetime_columns"]]
+
+
+
+def get_row_filters(schema_config: dict) -> list:
+    """
+    row filters of schema.yaml as (column, op, value) tuples for the parquet reader
+    """
+    return [tuple(row_filter) for row_filter in schema_config["row_filters"]]
+
+
+STORAGE_DTYPES = {"int8": "Int8", "int16": "Int16", "int32": "Int32", "float32": "float32", "float64": "float64",
+                  "category": "category", "datetime": "object"}
+NULLABLE_INT_RANGES = {"Int8": (-2 ** 7, 2 ** 7 - 1), "Int16": (-2 ** 15, 2 ** 15 - 1), "Int32": (-2 ** 31, 2 ** 31 - 1)}
+
+
+def get_dtype_plan(schema_config: dict) -> dict:
+    """
+    compact dtypes of schema.yaml storage_dtypes as read_csv dtypes, with the columns that are
+    converted after reading: nullable int columns are parsed as float32, since read_csv parses
+    nullable ints in a slow python path, and datetime columns are parsed from strings
+    """
+    try:
+        storage_dtypes = schema_config["storage_dtypes"]
+        int_columns = {column: STORAGE_DTYPES[kind] for column, kind in storage_dtypes.items() if kind.startswith("int")}
+        return {"dtypes": {column: "float32" if column in int_columns else STORAGE_DTYPES[kind]
+                           for column, kind in storage_dtypes.items()},
+                "int_columns": int_columns,
+                "datetime_columns": [column for column, kind in storage_dtypes.items() if kind == "datetime"],
+                "category_columns": [column for column, kind in storage_dtypes.items() if kind == "category"],
+                "datetime_format": schema_config.get("datetime_format")}
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+def apply_dtype_plan(df: DataFrame, dtype_plan: dict) -> DataFrame:
+    """
+    converts the columns of a chunk read with the dtypes of dtype_plan to their storage dtypes:
+    float32 to nullable ints, strings to datetimes, and decoded category columns back to categories.
+    Values that do not fit the int dtype, out of range or not integral, become missing and are
+    logged, so one dirty source value does not abort the ingestion
+    """
+    try:
+        for column, dtype in dtype_plan["int_columns"].items():
+            if column in df.columns and df[column].dtype != dtype:
+                values = df[column]
+                low, high = NULLABLE_INT_RANGES[dtype]
+                invalid = values.notna() & ~(values.between(low, high) & (values % 1 == 0))
+                if invalid.any():
+                    logging.info(f"{int(invalid.sum())} values of {column} do not fit {dtype}, "
+                                 f"e.g. {values[invalid].iloc[0]}, and were set to missing")
+                    values = values.mask(invalid)
+                df[column] = values.astype(dtype)
+        for column in dtype_plan["datetime_columns"]:
+            if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column], format=dtype_plan["datetime_format"], errors="coerce")
+        for column in dtype_plan["category_columns"]:
+            if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype("category")
+        return df
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+def memory_savings_report(df: DataFrame, baseline_dtypes: dict, sample_rows: int = 10_000) -> dict:
+    """
+    bytes per row of every column of df against the same column in its baseline dtype, float64 or
+    object strings, which is what the columns take without a dtype plan. Measured on the first
+    sample_rows rows, since formatting a whole chunk as strings costs as much as parsing it.
+    """
+    try:
+        df = df.head(sample_rows)
+        report = {}
+        for column in df.columns:
+            compact = df[column].memory_usage(index=False, deep=True)
+            if baseline_dtypes.get(column, "object") == "object":
+                baseline_series = df[column].astype(str).astype(object)
+            else:
+                baseline_series = df[column].astype(baseline_dtypes[column])
+            baseline = baseline_series.memory_usage(index=False, deep=True)
+            report[column] = {"dtype": str(df[column].dtype),
+                              "baseline_bytes_per_row": round(baseline / max(len(df), 1), 1),
+                              "bytes_per_row": round(compact / max(len(df), 1), 1),
+                              "saved_percent": round(100 * (1 - compact / baseline), 1) if baseline else 0.0}
+        return report
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+def row_hashes(df: DataFrame, key_columns: list, hash_key: str) -> np.ndarray:
+    """
+    keyed uint64 hash of the key columns of every row, the same on every run and machine. pandas
+    only applies hash_key to object columns, so the hashes are also xored with a salt derived from
+    hash_key and remixed with the splitmix64 finalizer: different keys give independent hashes
+    whatever the dtypes of the key columns
+    """
+    hashes = pd.util.hash_pandas_object(df[key_columns], index=False, hash_key=hash_key).to_numpy()
+    salt = np.uint64(int.from_bytes(hashlib.blake2b(hash_key.encode(), digest_size=8).digest(), "little"))
+    with np.errstate(over="ignore"):
+        hashes = hashes ^ salt
+        hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return hashes ^ (hashes >> np.uint64(31))
+
+
+def hash_split_mask(df: DataFrame, key_columns: list, test_ratio: float, hash_key: str) -> np.ndarray:
+    """
+    True for the rows of df that belong to the test set. Rows are assigned from a keyed hash of
+    their key columns, so the same row lands in the same split in every chunk, run and machine,
+    and duplicate trips never straddle train and test.
+    """
+    try:
+        hashes = row_hashes(df, key_columns, hash_key)
+        return (hashes % np.uint64(10_000)) < np.uint64(round(test_ratio * 10_000))
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+
+
+def stratum_ids(df: DataFrame, strata: list) -> np.ndarray:
+    """
+    uint64 id of the stratum of every row. strata items are [column] for the column value or
+    [column, part] for a part of a datetime column, e.g. [tpep_pickup_datetime, hour]
+    """
+    try:
+        parts = {}
+        for stratum in strata:
+            column = df[stratum[0]]
+            values = getattr(column.dt, stratum[1]) if len(stratum) > 1 else column
+            parts["/".join(stratum)] = pd.to_numeric(values, errors="coerce").astype("float64").fillna(-1)
+        return pd.util.hash_pandas_object(DataFrame(parts), index=False).to_numpy()
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+
+
+def rule_violation_masks(df: DataFrame, rules: dict) -> DataFrame:
+    """
+    Boolean frame with a column per validation rule of the schema, true where a row breaks it.
+    Missing values never break a rule.
+    """
+    try:
+        masks = {}
+        for column, (low, high) in rules.get("ranges", {}).items():
+            values = df[column]
+            in_range = values.between(-np.inf if low is None else low, np.inf if high is None else high)
+            rule = f"{column} in [{low}, {high}]" if low is not None and high is not None else \
+                f"{column} >= {low}" if low is not None else f"{column} <= {high}"
+            masks[rule] = values.notna() & ~in_range.fillna(True).astype(bool)
+        for column, allowed in rules.get("domains", {}).items():
+            values = df[column]
+            masks[f"{column} in {list(allowed)}"] = values.notna() & ~values.isin(allowed)
+        for earlier, later in rules.get("order", []):
+            masks[f"{earlier} <= {later}"] = (df[earlier] > df[later]).fillna(False).astype(bool)
+        return DataFrame(masks, index=df.index)
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+def _python_scalar(value):
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def validation_statistics(df: DataFrame, rules: dict) -> dict:
+    """
+    Mergeable statistics of one chunk: rows, violations per rule and per column null count, min
+    and max. Unordered categorical columns get no min and max.
+    """
+    try:
+        columns = {}
+        null_counts = df.isna().sum()
+        for column in df.columns:
+            values = df[column]
+            ordered = not isinstance(values.dtype, pd.CategoricalDtype) or values.cat.ordered
+            columns[column] = {"nulls": int(null_counts[column]),
+                               "min": _python_scalar(values.min()) if ordered else None,
+                               "max": _python_scalar(values.max()) if ordered else None}
+        violations = rule_violation_masks(df, rules).sum()
+        return {"rows": len(df), "violations": {rule: int(count) for rule, count in violations.items()}, "columns": columns}
+    except Exception as e:
+        raise NycException(e, sys) from e
+
+
+def merge_validation_statistics(total: dict, stats: dict) -> dict:
+    """
+    Merges the validation_statistics of a chunk into total, which may be empty, and returns it
+    """
+    total["rows"] = total.get("rows", 0) + stats["rows"]
+    violations = total.setdefault("violations", {})
+    for rule, count in stats["violations"].items():
+        violations[rule] = violations.get(rule, 0) + count
+    for column, column_stats in stats.get("columns", {}).items():
+        merged = total.setdefault("columns", {}).setdefault(column, {"nulls": 0, "min": None, "max": None})
+        merged["nulls"] += column_stats["nulls"]
+        if column_stats["min"] is not None:
+            merged["min"] = column_stats["min"] if merged["min"] is None else min(merged["min"], column_stats["min"])
+        if column_stats["max"] is not None:
+            merged["max"] = column_stats["max"] if merged["max"] is None else max(merged["max"], column_stats["max"])
+    return total
+
+
+
+
 def remove_outliers_iqr(df, column):
     try:
 
@@ -127,7 +346,8 @@ def remove_outliers_iqr(df, column):
         IQR = Q3 - Q1
         lower_bound = Q1 - 1.5 * IQR
         upper_bound = Q3 + 1.5 * IQR
-        return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
+        # missing values of nullable int columns compare to NA, they are dropped like NaN
+        return df[df[column].between(lower_bound, upper_bound).fillna(False).astype(bool)]
     except Exception as e:
         raise NycException(e, sys) from e
     
@@ -0,0 +1,245 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+DATASET_SKETCH_VERSION = 1
+PSI_EPSILON = 1e-4
+
+
+def _values(series: pd.Series) -> np.ndarray:
+    # nullable int and datetime columns become float64 with their missing values dropped
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+class KllSketch:
+    """
+    Mergeable KLL quantile sketch. Values enter level 0; a level over its capacity is sorted and
+    every other item, from a random offset, is promoted to the level above with twice the weight.
+    Capacities shrink by 2/3 per level below the top, so the sketch holds O(k log(n/k)) items and
+    quantile ranks are within about 1.7/k of n.
+    """
+
+    MIN_CAPACITY = 8
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def capacity(self, level: int) -> int:
+        return max(self.MIN_CAPACITY, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KllSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # an odd item out stays behind, so the total weight is preserved exactly
+                kept = items[len(items) - len(items) % 2:]
+                paired = items[:len(items) - len(items) % 2]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = kept
+            level += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def cdf(self, points: np.ndarray) -> np.ndarray:
+        """
+        Estimated fraction of the values less than or equal to each point
+        """
+        items, cumulative = self._weighted_items()
+        if not len(items):
+            return np.zeros(len(points))
+        ranks = np.searchsorted(items, points, side="right")
+        return np.where(ranks > 0, cumulative[np.maximum(ranks - 1, 0)], 0.0) / cumulative[-1]
+
+    def quantiles(self, fractions: np.ndarray) -> np.ndarray:
+        items, cumulative = self._weighted_items()
+        if not len(items):
+            return np.full(len(fractions), np.nan)
+        indexes = np.searchsorted(cumulative, np.asarray(fractions) * cumulative[-1], side="left")
+        return items[np.minimum(indexes, len(items) - 1)]
+
+    def items(self) -> np.ndarray:
+        return np.unique(np.concatenate(self.levels))
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "min": float(self.min) if self.n else None,
+                "max": float(self.max) if self.n else None, "levels": [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "KllSketch":
+        sketch = cls(state["k"])
+        sketch.n = state["n"]
+        sketch.min = np.inf if state["min"] is None else state["min"]
+        sketch.max = -np.inf if state["max"] is None else state["max"]
+        sketch.levels = [np.asarray(level, dtype="float64") for level in state["levels"]]
+        return sketch
+
+
+class CountMinSketch:
+    """
+    Mergeable Count-Min frequency sketch of integer values: depth rows of width counters, each
+    row indexed by its own keyed hash. Estimates never undercount and overcount by at most
+    about e/width of n with high probability.
+    """
+
+    # odd multipliers of the rows; the hash of numeric values ignores hash_key, so rows are
+    # derived by multiplying the one hash and taking the high bits
+    ROW_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                                0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9], dtype="uint64")
+
+    def __init__(self, width: int = 1024, depth: int = 4):
+        if depth > len(self.ROW_MULTIPLIERS):
+            raise ValueError(f"Count-Min sketch depth is at most {len(self.ROW_MULTIPLIERS)}")
+        self.width = width
+        self.depth = depth
+        self.n = 0
+        self.table = np.zeros((depth, width), dtype="int64")
+
+    def _indexes(self, values: np.ndarray) -> List[np.ndarray]:
+        hashes = pd.util.hash_array(np.asarray(values, dtype="int64"))
+        with np.errstate(over="ignore"):
+            return [((hashes * multiplier >> np.uint64(32)) % np.uint64(self.width)).astype("int64")
+                    for multiplier in self.ROW_MULTIPLIERS[:self.depth]]
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.n += len(values)
+        for row, indexes in enumerate(self._indexes(values)):
+            self.table[row] += np.bincount(indexes, minlength=self.width)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches of different shapes cannot be merged")
+        self.n += other.n
+        self.table += other.table
+
+    def estimate(self, values: np.ndarray) -> np.ndarray:
+        return np.min([self.table[row][indexes] for row, indexes in enumerate(self._indexes(values))], axis=0)
+
+    def to_dict(self) -> dict:
+        return {"width": self.width, "depth": self.depth, "n": self.n, "table": self.table.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CountMinSketch":
+        sketch = cls(state["width"], state["depth"])
+        sketch.n = state["n"]
+        sketch.table = np.asarray(state["table"], dtype="int64")
+        return sketch
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    """
+    PSI of two distributions over the same bins, given as counts or proportions
+    """
+    expected = np.maximum(np.asarray(expected, dtype="float64") / max(np.sum(expected), 1), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype="float64") / max(np.sum(actual), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DatasetSketch:
+    """
+    Quantile sketches of numeric columns and frequency sketches of id columns of a dataframe,
+    updated chunk by chunk in bounded memory and merged or persisted as a whole.
+    """
+
+    def __init__(self, quantile_columns: List[str], frequency_columns: List[str], k: int = 200,
+                 width: int = 1024, depth: int = 4):
+        self.rows = 0
+        self.quantiles: Dict[str, KllSketch] = {column: KllSketch(k) for column in quantile_columns}
+        self.frequencies: Dict[str, CountMinSketch] = {column: CountMinSketch(width, depth) for column in frequency_columns}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.quantiles) + list(self.frequencies)
+
+    def update(self, df: DataFrame) -> None:
+        self.rows += len(df)
+        for column, sketch in self.quantiles.items():
+            sketch.update(_values(df[column]))
+        for column, sketch in self.frequencies.items():
+            sketch.update(_values(df[column]))
+
+    def merge(self, other: "DatasetSketch") -> None:
+        self.rows += other.rows
+        for column, sketch in self.quantiles.items():
+            sketch.merge(other.quantiles[column])
+        for column, sketch in self.frequencies.items():
+            sketch.merge(other.frequencies[column])
+
+    def drift(self, current: "DatasetSketch", bins: int, frequency_domains: Dict[str, np.ndarray]) -> Dict[str, dict]:
+        """
+        Drift of current from this reference per column: PSI over the reference quantile bins and
+        the KS statistic for quantile sketches, PSI over the domain values for frequency sketches.
+        Columns without values on either side are left out.
+        """
+        scores = {}
+        for column, reference in self.quantiles.items():
+            sketch = current.quantiles[column]
+            if not reference.n or not sketch.n:
+                continue
+            edges = np.unique(reference.quantiles(np.linspace(0, 1, bins + 1)[1:-1]))
+            expected = np.diff(np.concatenate([[0.0], reference.cdf(edges), [1.0]]))
+            actual = np.diff(np.concatenate([[0.0], sketch.cdf(edges), [1.0]]))
+            points = np.union1d(reference.items(), sketch.items())
+            scores[column] = {"psi": population_stability_index(expected, actual),
+                              "ks": float(np.max(np.abs(reference.cdf(points) - sketch.cdf(points))))}
+        for column, reference in self.frequencies.items():
+            sketch = current.frequencies[column]
+            if not reference.n or not sketch.n:
+                continue
+            domain = frequency_domains[column]
+            scores[column] = {"psi": population_stability_index(reference.estimate(domain), sketch.estimate(domain))}
+        return scores
+
+    def to_dict(self) -> dict:
+        return {"version": DATASET_SKETCH_VERSION, "rows": self.rows,
+                "quantiles": {column: sketch.to_dict() for column, sketch in self.quantiles.items()},
+                "frequencies": {column: sketch.to_dict() for column, sketch in self.frequencies.items()}}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "DatasetSketch":
+        if state.get("version") != DATASET_SKETCH_VERSION:
+            raise Exception(f"Unsupported dataset sketch version {state.get('version')}")
+        sketch = cls([], [])
+        sketch.rows = state["rows"]
+        sketch.quantiles = {column: KllSketch.from_dict(value) for column, value in state["quantiles"].items()}
+        sketch.frequencies = {column: CountMinSketch.from_dict(value) for column, value in state["frequencies"].items()}
+        return sketch